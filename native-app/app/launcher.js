@@ -138,6 +138,9 @@ document.getElementById('sync-form').addEventListener('submit', async (e) => {
       case 'error':
         appendLog('✗ ' + msg.message, 'log-error');
         break;
+      case 'logs':
+        for (const message of msg.messages) appendLog(message);
+        break;
       case 'complete':
         // Handled below in the resolve path
         break;
@@ -228,6 +228,7 @@ ipcMain.handle('navigate', async (_event, page) => {
  * The Python script emits JSON-newline messages to stdout:
  *   {"type": "step",     "message": "Authenticating\u2026"}
  *   {"type": "log",      "message": "  [1/23] John Smith"}
+ *   {"type": "logs",     "messages": ["  [1/23] John Smith", "  [2/23] Jane Doe"]}
  *   {"type": "error",    "message": "Authentication failed"}
  *   {"type": "complete", "db_path": "/path/to/scouting_troop.db"}
  *
@@ -10,17 +10,24 @@ To rebuild after modifying the Python source:
   Windows:      build-scripts\\build-python-win.bat
 """
 
-import sys
 import os
+import sys
 
-# When PyInstaller bundles the app, sys._MEIPASS points to the temp directory
-# where the bundled files are extracted at runtime. Add it to sys.path so that
-# scouting_db (and its dependencies) can be imported.
-if getattr(sys, "frozen", False):
-    bundle_dir = getattr(sys, "_MEIPASS", os.path.dirname(sys.executable))
-    sys.path.insert(0, bundle_dir)
 
-from scouting_db.native_sync import main  # noqa: E402 — must come after path fix
+def _add_bundle_to_path():
+    # When PyInstaller bundles the app, sys._MEIPASS points to the temp
+    # directory where the bundled files are extracted at runtime. Add it to
+    # sys.path so that scouting_db (and its dependencies) can be imported.
+    if getattr(sys, "frozen", False):
+        bundle_dir = getattr(sys, "_MEIPASS", os.path.dirname(sys.executable))
+        if bundle_dir not in sys.path:
+            sys.path.insert(0, bundle_dir)
+
 
 if __name__ == "__main__":
+    # Path fix and the native_sync import happen only when run as the sync
+    # binary, so importing this module (e.g. from a test harness) is cheap.
+    _add_bundle_to_path()
+    from scouting_db.native_sync import main
+
     main()
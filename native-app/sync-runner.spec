@@ -34,6 +34,7 @@ a = Analysis(
         'scouting_db.api',
         'scouting_db.db',
         'scouting_db.native_sync',
+        'scouting_db.sync',
         # click is a runtime dependency (imported transitively)
         'click',
     ],
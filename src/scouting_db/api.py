@@ -1,13 +1,40 @@
 """HTTP client for api.scouting.org (stdlib only)."""
 
+import concurrent.futures
+import gzip
+import http.client
 import json
+import os
+import re
+import sqlite3
+import threading
+import time
 import urllib.request
 import urllib.error
 import urllib.parse
 
-BASE_URL = "https://api.scouting.org"
+API_HOST = "api.scouting.org"
+BASE_URL = f"https://{API_HOST}"
 AUTH_URL = "https://my.scouting.org/api/users/{username}/authenticate"
 
+# Per-scout getters that fetch_youth_bundle() can run concurrently.
+YOUTH_BUNDLE_GETTERS = {
+    "ranks": "get_youth_ranks",
+    "merit_badges": "get_youth_merit_badges",
+    "awards": "get_youth_awards",
+    "leadership": "get_leadership_history",
+    "profile": "get_person_profile",
+}
+# Idle keep-alive connections kept per client; enough for every sync worker
+# plus the bundle fetches they start.
+MAX_IDLE_CONNECTIONS = 16
+# Transient statuses a GET is retried on, with exponential backoff starting
+# at RETRY_BACKOFF seconds unless the server sends Retry-After.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.3
+MAX_RETRY_DELAY = 30
+
 _CHROME_UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -32,7 +59,7 @@ def authenticate(username, password):
     req.add_header("User-Agent", _CHROME_UA)
     try:
         with urllib.request.urlopen(req) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+            data = json.load(resp)
     except urllib.error.HTTPError as e:
         body_text = e.read().decode("utf-8", errors="replace")
         raise ScoutingAPIError(e.code, body_text) from e
@@ -51,29 +78,216 @@ class ScoutingAPIError(Exception):
         super().__init__(f"API error {status_code}: {message}")
 
 
+class _HTTPCache:
+    """Response bodies keyed by URL, with the validators to revalidate them
+    and the time until which they can be reused without asking at all."""
+
+    # Bump when the table layout changes; the cache is simply rebuilt.
+    VERSION = 1
+
+    def __init__(self, path):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.VERSION:
+            self._conn.executescript(f"""
+                DROP TABLE IF EXISTS http_cache;
+                CREATE TABLE http_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    expires_at REAL NOT NULL DEFAULT 0
+                );
+                PRAGMA user_version = {self.VERSION};
+            """)
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Return (etag, last_modified, body, expires_at) for *url*, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body, expires_at FROM http_cache "
+                "WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+    def put(self, url, etag, last_modified, body, expires_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(url, etag, last_modified, body, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, expires_at),
+            )
+            self._conn.commit()
+
+    def refresh(self, url, expires_at):
+        """Extend a revalidated (304) entry's lifetime."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE http_cache SET expires_at = ? WHERE url = ?",
+                (expires_at, url),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _retry_delay(resp, attempt):
+    """Seconds to wait before retry number *attempt* (0-based)."""
+    retry_after = resp.getheader("Retry-After")
+    if retry_after and retry_after.strip().isdigit():
+        return min(int(retry_after), MAX_RETRY_DELAY)
+    return RETRY_BACKOFF * 2 ** attempt
+
+
+def _max_age(resp):
+    """Seconds the response may be reused per Cache-Control, or None if it
+    must not be stored."""
+    directives = (resp.getheader("Cache-Control") or "").lower()
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    match = re.search(r"max-age=(\d+)", directives)
+    return int(match.group(1)) if match else 0
+
+
 class ScoutingAPI:
-    def __init__(self, token=None):
+    def __init__(self, token=None, cache_path=None):
+        """*cache_path*, if given, is a sqlite file used to reuse the public
+        definition endpoints for their Cache-Control max-age and then
+        revalidate them with conditional GETs instead of re-downloading them
+        on every sync."""
         self.token = token
+        self._cache = _HTTPCache(cache_path) if cache_path else None
+        # Idle keep-alive connections to API_HOST, shared by all threads so
+        # successive requests skip the TCP + TLS handshake.
+        self._idle = []
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def token(self):
+        return self._token
 
-    def _request(self, path, params=None, method="GET", body=None):
-        url = BASE_URL + path
+    @token.setter
+    def token(self, token):
+        # Request headers are built once per token; _request copies them
+        # only when it needs to add per-request fields.
+        self._token = token
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self._get_headers = headers
+        self._body_headers = {**headers, "Content-Type": "application/json"}
+
+    def _acquire(self):
+        """Return (connection, reused) from the idle pool or a new one."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return http.client.HTTPSConnection(API_HOST), False
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close pooled connections, the worker threads and the HTTP cache."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            executor, self._executor = self._executor, None
+        for conn in idle:
+            conn.close()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _send(self, method, url, data, headers):
+        """Send one request over a pooled connection; return (response, body).
+
+        A reused connection may have been closed by the server while idle,
+        so a failure on one is retried once on a fresh connection.
+        """
+        conn, reused = self._acquire()
+        while True:
+            try:
+                conn.request(method, url, body=data, headers=headers)
+                resp = conn.getresponse()
+                payload = resp.read()
+                break
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if not reused:
+                    raise
+                conn, reused = http.client.HTTPSConnection(API_HOST), False
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        return resp, payload
+
+    def _request(self, path, params=None, method="GET", body=None, cache=False):
+        url = path
         if params:
             url += "?" + urllib.parse.urlencode(params)
-        data = None
-        if body is not None:
-            data = json.dumps(body).encode("utf-8")
-        req = urllib.request.Request(url, data=data, method=method)
-        req.add_header("Accept", "application/json")
-        if data is not None:
-            req.add_header("Content-Type", "application/json")
-        if self.token:
-            req.add_header("Authorization", f"Bearer {self.token}")
-        try:
-            with urllib.request.urlopen(req) as resp:
-                return json.loads(resp.read().decode("utf-8"))
-        except urllib.error.HTTPError as e:
-            body_text = e.read().decode("utf-8", errors="replace")
-            raise ScoutingAPIError(e.code, body_text) from e
+        if body is None:
+            data = None
+            headers = self._get_headers
+        else:
+            # Compact separators; ensure_ascii output encodes 1:1 to ASCII
+            data = json.dumps(body, separators=(",", ":")).encode("ascii")
+            headers = self._body_headers
+        cache = self._cache if cache and method == "GET" else None
+        cached = cache.get(url) if cache else None
+        if cached:
+            etag, last_modified, cached_body, expires_at = cached
+            if expires_at > time.time():
+                return json.loads(cached_body)
+            headers = dict(headers)
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        for attempt in range(MAX_RETRIES + 1):
+            resp, payload = self._send(method, url, data, headers)
+            if (method != "GET" or resp.status not in RETRY_STATUSES
+                    or attempt == MAX_RETRIES):
+                break
+            time.sleep(_retry_delay(resp, attempt))
+        if resp.getheader("Content-Encoding") == "gzip":
+            payload = gzip.decompress(payload)
+        if resp.status == 304 and cached:
+            max_age = _max_age(resp)
+            if max_age:
+                cache.refresh(url, time.time() + max_age)
+            return json.loads(cached_body)
+        if not 200 <= resp.status < 300:
+            raise ScoutingAPIError(
+                resp.status, payload.decode("utf-8", errors="replace")
+            )
+        if cache:
+            etag = resp.getheader("ETag")
+            last_modified = resp.getheader("Last-Modified")
+            max_age = _max_age(resp)
+            if max_age is not None and (etag or last_modified or max_age):
+                cache.put(url, etag, last_modified, payload, time.time() + max_age)
+        return json.loads(payload)
 
     # --- Public endpoints (no auth) ---
 
@@ -81,10 +295,12 @@ class ScoutingAPI:
         params = {"version": version, "status": status}
         if program_id is not None:
             params["programId"] = program_id
-        return self._request("/advancements/ranks", params)
+        return self._request("/advancements/ranks", params, cache=True)
 
     def get_rank_requirements(self, rank_id):
-        return self._request(f"/advancements/ranks/{rank_id}/requirements")
+        return self._request(
+            f"/advancements/ranks/{rank_id}/requirements", cache=True
+        )
 
     # --- Auth-required endpoints ---
 
@@ -100,7 +316,7 @@ class ScoutingAPI:
     def get_mb_requirements(self, mb_id):
         """Public endpoint: requirement definitions for a merit badge."""
         return self._request(
-            f"/advancements/meritBadges/{mb_id}/requirements"
+            f"/advancements/meritBadges/{mb_id}/requirements", cache=True
         )
 
     def get_youth_mb_requirements(self, user_id, mb_id):
@@ -124,6 +340,25 @@ class ScoutingAPI:
         """Auth endpoint: person profile data (includes birthdate)."""
         return self._request(f"/persons/v2/{user_id}/personprofile")
 
+    def fetch_youth_bundle(self, user_id, parts=tuple(YOUTH_BUNDLE_GETTERS)):
+        """Start the per-scout getters named in *parts* concurrently.
+
+        Returns a dict mapping each part name (a key of YOUTH_BUNDLE_GETTERS)
+        to a Future; ``future.result()`` returns the parsed JSON or raises
+        ScoutingAPIError just as the getter itself would.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=8, thread_name_prefix="scouting-api"
+                )
+        return {
+            part: self._executor.submit(
+                getattr(self, YOUTH_BUNDLE_GETTERS[part]), user_id
+            )
+            for part in parts
+        }
+
     def validate_token(self, user_id):
         """Verify the token is valid by making a lightweight auth-required request.
 
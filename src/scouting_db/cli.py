@@ -13,42 +13,64 @@ Usage examples:
 """
 
 import argparse
-import getpass
+import concurrent.futures
+import functools
 import json
 import os
 import sys
+import time
+from datetime import datetime, timedelta, timezone
 
-import click
-
-from scouting_db.api import ScoutingAPI, ScoutingAPIError, authenticate
+# click, getpass, the API client (http.client/ssl) and the query module are
+# imported inside the commands that use them, so e.g. `init` and `add-scout`
+# start fast.
 from scouting_db.db import (
+    DEFAULT_DB_PATH,
+    RANK_DEFINITIONS_MAX_AGE,
+    analyze,
+    begin_scout_writes,
+    commit_completed_scouts,
+    drop_indexes,
+    end_scout_writes,
     get_connection,
     import_roster_csv,
     init_db,
+    latest_mb_version,
+    mark_scout_synced,
+    ranks_needing_requirements,
+    restore_indexes,
     set_setting,
     store_leadership,
     store_youth_mb_requirements,
     store_youth_merit_badges,
     store_youth_rank_requirements,
     store_youth_ranks,
+    stored_definitions,
     upsert_mb_requirements,
     upsert_ranks,
     upsert_requirements,
     upsert_scout,
 )
-from scouting_db.queries import (
-    mb_requirement_detail,
-    most_common_incomplete_merit_badges,
-    optimal_group_activities,
-    per_scout_summary,
-    requirement_completion_matrix,
-    scouts_closest_to_next_rank,
+from scouting_db.sync import (
+    DEFAULT_JOBS,
+    SCOUTS_BSA_PROGRAM_ID,
+    SYNC_COMMIT_INTERVAL,
+    fetch_scouts,
+)
+
+# Conditional-GET cache for the public rank/MB definition endpoints
+HTTP_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".scouting-troop-stats", "http-cache.db"
 )
 
-SCOUTS_BSA_PROGRAM_ID = 2
+# A config.json token written this recently (e.g. by get-token) is trusted
+# without a validation request.
+FRESH_TOKEN_SECONDS = 600
 
 
+@functools.lru_cache(maxsize=1)
 def get_token():
+    """Return the API token from SCOUTING_TOKEN or ./config.json (read once)."""
     token = os.environ.get("SCOUTING_TOKEN")
     if token:
         return token
@@ -59,6 +81,18 @@ def get_token():
     return ""
 
 
+def _token_is_fresh():
+    """True if the token comes from a config.json written in the last
+    FRESH_TOKEN_SECONDS."""
+    if os.environ.get("SCOUTING_TOKEN"):
+        return False
+    try:
+        mtime = os.path.getmtime(os.path.join(os.getcwd(), "config.json"))
+    except OSError:
+        return False
+    return time.time() - mtime < FRESH_TOKEN_SECONDS
+
+
 def require_token():
     token = get_token()
     if not token:
@@ -91,26 +125,36 @@ def cmd_init(args):
 
 
 def cmd_sync_ranks(args):
+    from scouting_db.api import ScoutingAPI, ScoutingAPIError
+
     conn = get_connection(args.db)
     init_db(conn)
     _ensure_troop_name(conn)
-    api = ScoutingAPI()
+    api = ScoutingAPI(cache_path=HTTP_CACHE_PATH)
 
     print("Fetching ranks...")
     ranks_data = api.get_ranks(program_id=SCOUTS_BSA_PROGRAM_ID)
     count = upsert_ranks(conn, ranks_data)
+    conn.commit()  # don't hold the write lock across the requirement fetches
     print(f"  Stored {count} ranks")
 
-    rows = conn.execute(
-        "SELECT id, name FROM ranks WHERE program_id = ? ORDER BY level",
-        (SCOUTS_BSA_PROGRAM_ID,),
-    ).fetchall()
+    # Rank requirements rarely change; ones stored within the last week are
+    # kept unless --refresh-defs.
+    max_age = None if getattr(args, "refresh_defs", False) else RANK_DEFINITIONS_MAX_AGE
+    rows = ranks_needing_requirements(conn, SCOUTS_BSA_PROGRAM_ID, max_age)
+    if not rows:
+        print("  Rank requirements are current (use --refresh-defs to re-download)")
 
-    for row in rows:
+    # All ranks are requested at once; results are stored in rank order on
+    # this thread.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(rows))) as pool:
+        futures = [pool.submit(api.get_rank_requirements, row["id"]) for row in rows]
+
+    for row, fut in zip(rows, futures):
         rank_id, rank_name = row["id"], row["name"]
         print(f"Fetching requirements for {rank_name} (id={rank_id})...")
         try:
-            data = api.get_rank_requirements(rank_id)
+            data = fut.result()
             reqs = data.get("requirements", data.get("value", []))
             if isinstance(reqs, dict):
                 reqs = reqs.get("requirements", [])
@@ -119,12 +163,14 @@ def cmd_sync_ranks(args):
         except ScoutingAPIError as e:
             print(f"  Warning: failed to fetch requirements: {e}")
 
+    conn.commit()
+    api.close()
     conn.close()
     print("Done.")
 
 
 def cmd_import_roster(args):
-    conn = get_connection(args.db)
+    conn = get_connection(args.db, bulk=True)
     init_db(conn)
     _ensure_troop_name(conn)
     try:
@@ -144,12 +190,18 @@ def cmd_add_scout(args):
     first = name_parts[0] if name_parts[0] else None
     last = name_parts[1] if len(name_parts) > 1 else None
     upsert_scout(conn, args.user_id, first, last)
+    conn.commit()
     conn.close()
     print(f"Added Scout {args.user_id}" + (f" ({args.name})" if args.name else ""))
 
 
-def _abort_if_unauthorized(e, conn):
-    """Exit immediately with a helpful message on 401 Unauthorized."""
+def _abort_if_unauthorized(e):
+    """Exit immediately with a helpful message on 401 Unauthorized.
+
+    The sync loop's handler commits the Scouts already synced on the way out.
+    """
+    import click
+
     if e.status_code == 401:
         click.echo("")  # close any partial output line
         click.echo(
@@ -160,176 +212,255 @@ def _abort_if_unauthorized(e, conn):
             ),
             err=True,
         )
-        conn.close()
         sys.exit(1)
 
 
-def _ok(text):
-    return click.style(text, fg="green")
-
-def _err(text):
-    return click.style(text, fg="red")
-
-def _dim(text):
-    return click.style(text, fg="bright_black")
+def cmd_sync_scouts(args):
+    import click
 
+    from scouting_db.api import ScoutingAPI, ScoutingAPIError
 
-def cmd_sync_scouts(args):
     token = require_token()
     conn = get_connection(args.db)
     init_db(conn)
     _ensure_troop_name(conn)
-    api = ScoutingAPI(token=token)
-
-    scouts = conn.execute(
-        "SELECT user_id, first_name, last_name FROM scouts"
+    api = ScoutingAPI(token=token, cache_path=HTTP_CACHE_PATH)
+
+    # Plain tuples: the roster is unpacked by position below.
+    cur = conn.cursor()
+    cur.row_factory = None
+    scouts = cur.execute(
+        "SELECT user_id,"
+        " TRIM(COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')) AS label,"
+        " advancements_synced_at, birthdate"
+        " FROM scouts"
     ).fetchall()
     if not scouts:
         click.echo(click.style("No Scouts registered.", fg="yellow")
                    + " Use 'import-roster' or 'add-scout' first.")
+        api.close()
         conn.close()
         return
 
-    # Validate auth before starting the full sync loop
-    click.echo("Validating auth... ", nl=False)
-    try:
-        api.validate_token(scouts[0]["user_id"])
-        click.echo(click.style("✓", fg="green", bold=True))
-    except ScoutingAPIError as e:
-        click.echo("")
-        _abort_if_unauthorized(e, conn)
-        click.echo(click.style(f"⚠  auth check returned {e.status_code}, proceeding anyway.", fg="yellow"))
+    max_age = getattr(args, "max_age", 0)
+    if max_age:
+        # Both sides come from datetime.isoformat() in UTC, so they compare
+        # correctly as strings.
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=max_age)).isoformat()
+        stale = [s for s in scouts if (s[2] or "") <= cutoff]
+        skipped = len(scouts) - len(stale)
+        scouts = stale
+        click.echo(click.style(
+            f"Skipping {skipped} Scout{'s' if skipped != 1 else ''} "
+            f"synced in the last {max_age:g}h.",
+            fg="bright_black",
+        ))
+        if not scouts:
+            api.close()
+            conn.close()
+            return
+
+    # Validate auth before starting the full sync loop, unless get-token
+    # just wrote it.
+    if not _token_is_fresh():
+        click.echo("Validating auth... ", nl=False)
+        try:
+            api.validate_token(scouts[0][0])
+            click.echo(click.style("✓", fg="green", bold=True))
+        except ScoutingAPIError as e:
+            click.echo("")
+            _abort_if_unauthorized(e)
+            click.echo(click.style(f"⚠  auth check returned {e.status_code}, proceeding anyway.", fg="yellow"))
 
     skip_reqs = getattr(args, "skip_reqs", False)
-    # Cache MB requirement definitions to avoid re-fetching for multiple Scouts
-    mb_defn_cache = {}  # mb_id -> version_id (already stored)
-    # Cache rank requirement definitions to avoid re-fetching
-    rank_defn_cache = set()  # rank_ids already stored
+    jobs = getattr(args, "jobs", DEFAULT_JOBS)
+    # Requirement definitions already on disk aren't fetched again; ones
+    # fetched during this sync are stored once.
+    rank_defn_cache, stored_mb_versions = stored_definitions(conn)
+    mb_defn_cache = {}  # mb_id -> version_id stored during this sync
 
     total = len(scouts)
     width = len(str(total))
     click.echo(f"\nSyncing {click.style(str(total), bold=True)} Scout{'s' if total != 1 else ''}\n")
 
-    for i, scout in enumerate(scouts, 1):
-        uid = scout["user_id"]
-        name = f"{scout['first_name'] or ''} {scout['last_name'] or ''}".strip()
-        label = name or uid
+    # Styled templates are built once; the loop only fills them in.
+    ok = click.style("{}", fg="green").format
+    err = click.style("{}", fg="red").format
+    bold = click.style("{}", bold=True).format
+    counter = click.style(f"[{{:>{width}}}/{total}]", fg="bright_black").format
 
-        counter = _dim(f"[{i:>{width}}/{total}]")
-        click.echo(f"  {counter} {click.style(label, bold=True)}", nl=False)
+    saved_indexes = drop_indexes(conn) if getattr(args, "bulk", False) else None
 
-        ranks_data = None
-        try:
-            ranks_data = api.get_youth_ranks(uid)
-            count = store_youth_ranks(conn, uid, ranks_data)
-            click.echo(f"  {_ok(f'ranks({count})')}", nl=False)
-        except ScoutingAPIError as e:
-            _abort_if_unauthorized(e, conn)
-            click.echo(f"  {_err(f'[ranks:{e.status_code}]')}", nl=False)
-
-        # Fetch per-requirement completion for in-progress ranks
-        if not skip_reqs and ranks_data:
-            in_progress_ranks = []
-            for prog in ranks_data.get("program") or []:
-                if prog.get("programId") != SCOUTS_BSA_PROGRAM_ID:
-                    continue
-                for rank in prog.get("ranks") or []:
-                    if not (rank.get("dateEarned") or rank.get("dateCompleted")):
-                        rank_id = rank.get("id")
-                        if rank_id:
-                            in_progress_ranks.append(int(rank_id))
+    uids = [s[0] for s in scouts]
+    labels = [s[1] or s[0] for s in scouts]
+    # Birthdates don't change, so the profile is only fetched for Scouts
+    # without one unless --force-profile.
+    if getattr(args, "force_profile", False):
+        have_birthdate = ()
+    else:
+        have_birthdate = [s[0] for s in scouts if s[3]]
+
+    # Scouts are fetched concurrently; results arrive here in roster order so
+    # every database write stays on this thread.
+    fetches = fetch_scouts(
+        api, uids, skip_reqs=skip_reqs, jobs=jobs,
+        stored_defs=(rank_defn_cache, stored_mb_versions),
+        skip_profile=have_birthdate,
+        # Commit rather than hold the write lock while the next Scout is
+        # still on the network; back-to-back results share one commit.
+        before_wait=conn.commit,
+    )
+    try:
+        for i, (uid, label, fetched) in enumerate(zip(uids, labels, fetches), 1):
+            click.echo(f"  {counter(i)} {bold(label)}", nl=False)
+            # One savepoint per Scout, so stopping mid-Scout keeps the others.
+            begin_scout_writes(conn)
+            # Only a sync with every part and requirement detail counts toward
+            # --max-age.
+            complete = not skip_reqs
+
+            try:
+                ranks_data = fetched.parts["ranks"].result()
+                count = store_youth_ranks(conn, uid, ranks_data)
+                click.echo(f"  {ok(f'ranks({count})')}", nl=False)
+            except ScoutingAPIError as e:
+                _abort_if_unauthorized(e)
+                complete = False
+                click.echo(f"  {err(f'[ranks:{e.status_code}]')}", nl=False)
+
+            # Per-requirement completion for in-progress ranks
             rank_req_count = 0
-            for rank_id in in_progress_ranks:
+            for rank_id, result in fetched.rank_reqs:
                 try:
-                    # Cache rank requirement definitions
+                    defn, youth_reqs = result.result()
                     if rank_id not in rank_defn_cache:
-                        defn = api.get_rank_requirements(rank_id)
                         upsert_requirements(conn, rank_id, defn)
                         rank_defn_cache.add(rank_id)
-
-                    youth_reqs = api.get_youth_rank_requirements(uid, rank_id)
                     rank_req_count += store_youth_rank_requirements(
                         conn, uid, rank_id, youth_reqs
                     )
                 except ScoutingAPIError as e:
-                    _abort_if_unauthorized(e, conn)
+                    _abort_if_unauthorized(e)
+                    complete = False
             if rank_req_count:
-                click.echo(f"  {_ok(f'rank_reqs({rank_req_count})')}", nl=False)
+                click.echo(f"  {ok(f'rank_reqs({rank_req_count})')}", nl=False)
 
-        mb_data = None
-        try:
-            mb_data = api.get_youth_merit_badges(uid)
-            earned, total_mbs = store_youth_merit_badges(conn, uid, mb_data)
-            click.echo(f"  {_ok(f'mbs({earned}/{total_mbs})')}", nl=False)
-        except ScoutingAPIError as e:
-            _abort_if_unauthorized(e, conn)
-            click.echo(f"  {_err(f'[mbs:{e.status_code}]')}", nl=False)
+            try:
+                mb_data = fetched.parts["merit_badges"].result()
+                earned, total_mbs = store_youth_merit_badges(conn, uid, mb_data)
+                click.echo(f"  {ok(f'mbs({earned}/{total_mbs})')}", nl=False)
+            except ScoutingAPIError as e:
+                _abort_if_unauthorized(e)
+                complete = False
+                click.echo(f"  {err(f'[mbs:{e.status_code}]')}", nl=False)
 
-        try:
-            lead_data = api.get_leadership_history(uid)
-            count = store_leadership(conn, uid, lead_data)
-            click.echo(f"  {_ok(f'leadership({count})')}", nl=False)
-        except ScoutingAPIError as e:
-            _abort_if_unauthorized(e, conn)
-            click.echo(f"  {_err(f'[lead:{e.status_code}]')}", nl=False)
+            try:
+                lead_data = fetched.parts["leadership"].result()
+                count = store_leadership(conn, uid, lead_data)
+                click.echo(f"  {ok(f'leadership({count})')}", nl=False)
+            except ScoutingAPIError as e:
+                _abort_if_unauthorized(e)
+                complete = False
+                click.echo(f"  {err(f'[lead:{e.status_code}]')}", nl=False)
 
-        try:
-            profile = api.get_person_profile(uid)
-            birthdate = (
-                profile.get("dateOfBirth")
-                or profile.get("birthDate")
-                or profile.get("dob")
-                or (profile.get("profile") or {}).get("dateOfBirth")
-            )
-            if birthdate:
-                upsert_scout(conn, uid, birthdate=birthdate)
-                click.echo(f"  {_ok('dob')}", nl=False)
-        except ScoutingAPIError as e:
-            _abort_if_unauthorized(e, conn)
-            click.echo(f"  {_err(f'[dob:{e.status_code}]')}", nl=False)
-
-        # Fetch per-requirement completion for in-progress MBs
-        if not skip_reqs and mb_data:
-            in_progress = [
-                mb for mb in (mb_data if isinstance(mb_data, list) else [])
-                if not (mb.get("dateCompleted") or mb.get("dateEarned"))
-            ]
+            try:
+                if "profile" in fetched.parts:
+                    profile = fetched.parts["profile"].result()
+                    birthdate = (
+                        profile.get("dateOfBirth")
+                        or profile.get("birthDate")
+                        or profile.get("dob")
+                        or (profile.get("profile") or {}).get("dateOfBirth")
+                    )
+                    if birthdate:
+                        upsert_scout(conn, uid, birthdate=birthdate)
+                        click.echo(f"  {ok('dob')}", nl=False)
+            except ScoutingAPIError as e:
+                _abort_if_unauthorized(e)
+                complete = False
+                click.echo(f"  {err(f'[dob:{e.status_code}]')}", nl=False)
+
+            # Per-requirement completion for in-progress MBs
             req_count = 0
-            for mb in in_progress:
-                mb_id = mb.get("id")
-                if not mb_id:
-                    continue
+            for mb, result in fetched.mb_reqs:
+                mb_id = mb["id"]
                 try:
-                    # Cache requirement definitions per MB id
-                    if mb_id not in mb_defn_cache:
-                        defn = api.get_mb_requirements(mb_id)
-                        version_id = defn.get("versionId") or mb.get("versionId") or ""
-                        upsert_mb_requirements(conn, mb_id, version_id, defn)
-                        mb_defn_cache[mb_id] = version_id
-
-                    # Per-Scout completion
-                    youth_reqs = api.get_youth_mb_requirements(uid, mb_id)
-                    version_id = mb_defn_cache.get(mb_id) or mb.get("versionId") or ""
+                    defn, youth_reqs = result.result()
+                    if defn is None:  # already on disk
+                        version_id = mb.get("versionId") or latest_mb_version(stored_mb_versions[mb_id])
+                    else:
+                        if mb_id not in mb_defn_cache:
+                            version_id = defn.get("versionId") or mb.get("versionId") or ""
+                            upsert_mb_requirements(conn, mb_id, version_id, defn)
+                            mb_defn_cache[mb_id] = version_id
+                        version_id = mb_defn_cache[mb_id] or mb.get("versionId") or ""
                     req_count += store_youth_mb_requirements(
                         conn, uid, mb_id, version_id, youth_reqs
                     )
                 except ScoutingAPIError as e:
-                    _abort_if_unauthorized(e, conn)
+                    _abort_if_unauthorized(e)
+                    complete = False
             if req_count:
-                click.echo(f"  {_ok(f'reqs({req_count})')}", nl=False)
-
-        click.echo("")  # end of scout line
+                click.echo(f"  {ok(f'reqs({req_count})')}", nl=False)
+
+            if complete:
+                mark_scout_synced(conn, uid)
+            end_scout_writes(conn)
+            if i % SYNC_COMMIT_INTERVAL == 0:
+                conn.commit()
+            click.echo("")  # end of scout line
+    except BaseException:
+        # Whatever stopped the run (a 401, a network error, Ctrl-C), keep
+        # every Scout already synced.
+        commit_completed_scouts(conn)
+        raise
+
+    conn.commit()
+    if saved_indexes is not None:
+        click.echo(click.style("\nRebuilding indexes...", fg="bright_black"))
+        restore_indexes(conn, saved_indexes)
+    else:
+        analyze(conn)
 
+    api.close()
     conn.close()
     click.echo(f"\n{click.style('✓', fg='green', bold=True)} Done — synced {total} Scout{'s' if total != 1 else ''}.")
 
 
+_PREVIEW_ENCODER = json.JSONEncoder(indent=2)
+
+
+def _print_probe(label, fut, limit):
+    """Print one discover probe's outcome, truncating the JSON preview."""
+    from scouting_db.api import ScoutingAPIError
+
+    print(f"  {label}...", end=" ", flush=True)
+    try:
+        data = fut.result()
+        # Encode incrementally and stop once past the limit, rather than
+        # serialising a large response only to cut it off.
+        chunks, size = [], 0
+        for chunk in _PREVIEW_ENCODER.iterencode(data):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > limit:
+                break
+        preview = "".join(chunks)
+        if size > limit:
+            preview = preview[:limit] + "\n  ... (truncated)"
+        print(f"OK\n{preview}\n")
+    except ScoutingAPIError as e:
+        print(f"{e.status_code}: {e.message[:200]}")
+
+
 def cmd_discover(args):
+    from scouting_db.api import ScoutingAPI
+
     token = require_token()
     conn = get_connection(args.db)
     init_db(conn)
     _ensure_troop_name(conn)
-    api = ScoutingAPI(token=token)
+    api = ScoutingAPI(token=token, cache_path=HTTP_CACHE_PATH)
     uid = args.user_id
 
     print(f"Probing API endpoints for user {uid}...\n")
@@ -342,19 +473,7 @@ def cmd_discover(args):
         ("GET  /advancements/youth/{uid}/leadershipPositionHistory", "GET", f"/advancements/youth/{uid}/leadershipPositionHistory"),
     ]
 
-    for label, method, path in paths:
-        print(f"  {label}...", end=" ", flush=True)
-        try:
-            data = api._request(path, method=method)
-            preview = json.dumps(data, indent=2)
-            if len(preview) > 500:
-                preview = preview[:500] + "\n  ... (truncated)"
-            print(f"OK\n{preview}\n")
-        except ScoutingAPIError as e:
-            print(f"{e.status_code}: {e.message[:200]}")
-
-    # Probe rank requirement endpoints using a sample in-progress rank
-    print("\n--- Rank Requirement Endpoint Probing ---\n")
+    # Sample in-progress rank and MB for the requirement endpoint probes
     sample_rank = conn.execute(
         "SELECT advancement_id, advancement_name FROM scout_advancements "
         "WHERE scout_user_id = ? AND advancement_type = 'rank' "
@@ -366,33 +485,16 @@ def cmd_discover(args):
             "SELECT advancement_id, advancement_name FROM scout_advancements "
             "WHERE advancement_type = 'rank' AND status = 'in_progress' LIMIT 1"
         ).fetchone()
-
+    rank_probes = []
     if sample_rank:
         rank_id = sample_rank["advancement_id"]
-        rank_name = sample_rank["advancement_name"] or "Unknown"
-        print(f"  Sample rank: {rank_name} (id={rank_id})\n")
-
         rank_probes = [
             (f"GET  /advancements/ranks/{rank_id}/requirements (public, definitions)",
              f"/advancements/ranks/{rank_id}/requirements"),
             (f"GET  /advancements/v2/youth/{uid}/ranks/{rank_id}/requirements (auth, per-Scout)",
              f"/advancements/v2/youth/{uid}/ranks/{rank_id}/requirements"),
         ]
-        for label, path in rank_probes:
-            print(f"  {label}...", end=" ", flush=True)
-            try:
-                data = api._request(path)
-                preview = json.dumps(data, indent=2)
-                if len(preview) > 1000:
-                    preview = preview[:1000] + "\n  ... (truncated)"
-                print(f"OK\n{preview}\n")
-            except ScoutingAPIError as e:
-                print(f"{e.status_code}: {e.message[:200]}")
-    else:
-        print("  No in-progress ranks found to probe requirement endpoints.")
 
-    # Probe MB requirement endpoints using a sample in-progress MB
-    print("\n--- MB Requirement Endpoint Probing ---\n")
     sample = conn.execute(
         "SELECT mb_api_id, mb_version_id, merit_badge_name FROM scout_merit_badges "
         "WHERE scout_user_id = ? AND status = 'in_progress' LIMIT 1",
@@ -403,174 +505,216 @@ def cmd_discover(args):
             "SELECT mb_api_id, mb_version_id, merit_badge_name FROM scout_merit_badges "
             "WHERE status = 'in_progress' LIMIT 1"
         ).fetchone()
-
+    mb_probes = []
     if sample:
         mb_id = sample["mb_api_id"]
-        version_id = sample["mb_version_id"]
-        mb_name = sample["merit_badge_name"]
-        print(f"  Sample MB: {mb_name} (id={mb_id}, versionId={version_id})\n")
-
         mb_probes = [
             (f"GET  /advancements/meritBadges/{mb_id}/requirements (public, by mb id)",
              f"/advancements/meritBadges/{mb_id}/requirements"),
             (f"GET  /advancements/v2/youth/{uid}/meritBadges/{mb_id}/requirements (auth, per-Scout)",
              f"/advancements/v2/youth/{uid}/meritBadges/{mb_id}/requirements"),
         ]
-        for label, path in mb_probes:
-            print(f"  {label}...", end=" ", flush=True)
-            try:
-                data = api._request(path)
-                preview = json.dumps(data, indent=2)
-                if len(preview) > 1000:
-                    preview = preview[:1000] + "\n  ... (truncated)"
-                print(f"OK\n{preview}\n")
-            except ScoutingAPIError as e:
-                print(f"{e.status_code}: {e.message[:200]}")
+
+    # Every probe is independent: send them all at once, print in order.
+    n_probes = len(paths) + len(rank_probes) + len(mb_probes)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_probes) as pool:
+        path_futs = [pool.submit(api._request, path, method=method)
+                     for _, method, path in paths]
+        rank_futs = [pool.submit(api._request, path) for _, path in rank_probes]
+        mb_futs = [pool.submit(api._request, path) for _, path in mb_probes]
+
+    for (label, _, _), fut in zip(paths, path_futs):
+        _print_probe(label, fut, 500)
+
+    print("\n--- Rank Requirement Endpoint Probing ---\n")
+    if sample_rank:
+        rank_name = sample_rank["advancement_name"] or "Unknown"
+        print(f"  Sample rank: {rank_name} (id={rank_id})\n")
+        for (label, _), fut in zip(rank_probes, rank_futs):
+            _print_probe(label, fut, 1000)
+    else:
+        print("  No in-progress ranks found to probe requirement endpoints.")
+
+    print("\n--- MB Requirement Endpoint Probing ---\n")
+    if sample:
+        print(f"  Sample MB: {sample['merit_badge_name']} "
+              f"(id={mb_id}, versionId={sample['mb_version_id']})\n")
+        for (label, _), fut in zip(mb_probes, mb_futs):
+            _print_probe(label, fut, 1000)
     else:
         print("  No in-progress MBs found to probe requirement endpoints.")
 
+    api.close()
     conn.close()
 
 
+def _query_needs_mb(conn, args):
+    from scouting_db.queries import most_common_incomplete_merit_badges
 
-def cmd_query(args):
-    conn = get_connection(args.db)
+    rows = most_common_incomplete_merit_badges(
+        conn, args.limit, eagle_only=args.eagle_only
+    )
+    if not rows:
+        return ["No data. Run sync-ranks and sync-scouts first."]
+    title = "Eagle-Required" if args.eagle_only else "All"
+    out = [
+        f"\nMost Common Unfinished Merit Badges ({title}):\n",
+        f"  {'Merit Badge':<40} {'Eagle':<6} {'Need':<6} {'%':>6}",
+        f"  {'-'*40} {'-'*5} {'-'*5} {'-'*6}",
+    ]
+    out.extend(
+        f"  {r['merit_badge']:<40} {' *' if r['is_eagle_required'] else '':<6} "
+        f"{r['scouts_needing']:<6} {r['pct_needing']:>5}%"
+        for r in rows
+    )
+    return out
 
-    if args.query_name == "needs-mb":
-        rows = most_common_incomplete_merit_badges(
-            conn, args.limit, eagle_only=args.eagle_only
-        )
-        if not rows:
-            print("No data. Run sync-ranks and sync-scouts first.")
-            conn.close()
-            return
-        title = "Eagle-Required" if args.eagle_only else "All"
-        print(f"\nMost Common Unfinished Merit Badges ({title}):\n")
-        print(f"  {'Merit Badge':<40} {'Eagle':<6} {'Need':<6} {'%':>6}")
-        print(f"  {'-'*40} {'-'*5} {'-'*5} {'-'*6}")
-        for r in rows:
-            eagle = " *" if r["is_eagle_required"] else ""
-            print(
-                f"  {r['merit_badge']:<40} {eagle:<6} "
-                f"{r['scouts_needing']:<6} {r['pct_needing']:>5}%"
-            )
-
-    elif args.query_name == "next-rank":
-        rows = scouts_closest_to_next_rank(conn)
-        if not rows:
-            print("No data. Run sync-ranks and sync-scouts first.")
-            conn.close()
-            return
-        print("\nScouts Closest to Next Rank:\n")
-        print(
-            f"  {'Scout':<25} {'Current':<14} {'Next':<14} "
-            f"{'Done':<5} {'Left':<5} {'%':>6}"
-        )
-        print(f"  {'-'*25} {'-'*13} {'-'*13} {'-'*4} {'-'*4} {'-'*6}")
-        for r in rows:
-            print(
-                f"  {r['scout_name']:<25} "
-                f"{(r['current_rank'] or 'None'):<14} "
-                f"{r['next_rank_name']:<14} "
-                f"{r['completed_requirements']:<5} "
-                f"{r['remaining']:<5} "
-                f"{r['pct_complete']:>5}%"
-            )
-
-    elif args.query_name == "req-matrix":
-        if not args.rank_id:
-            ranks = conn.execute(
-                "SELECT id, name FROM ranks WHERE program_id = 2 ORDER BY level"
-            ).fetchall()
-            print("Specify --rank-id. Available Scouts BSA ranks:")
-            for r in ranks:
-                print(f"  {r['id']}: {r['name']}")
-            conn.close()
-            return
-        rows = requirement_completion_matrix(conn, args.rank_id)
-        if not rows:
-            print("No data for that rank.")
-            conn.close()
-            return
-        rank_name = conn.execute(
-            "SELECT name FROM ranks WHERE id = ?", (args.rank_id,)
-        ).fetchone()
-        print(f"\nRequirement Completion Matrix: {rank_name['name'] if rank_name else args.rank_id}\n")
-        print(f"  {'Req':<6} {'Description':<50} {'Need':<5} {'%':>6}")
-        print(f"  {'-'*5} {'-'*50} {'-'*4} {'-'*6}")
-        for r in rows:
-            desc = (r["requirement_desc"] or "")[:48]
-            print(
-                f"  {r['requirement_number'] or '':<6} {desc:<50} "
-                f"{r['scouts_needing']:<5} {r['pct_incomplete']:>5}%"
-            )
-
-    elif args.query_name == "summary":
-        rows = per_scout_summary(conn)
-        if not rows:
-            print("No Scouts in database.")
-            conn.close()
-            return
-        print(f"\nTroop Summary ({len(rows)} Scouts):\n")
-        print(
-            f"  {'Scout':<25} {'Rank':<14} {'MBs':<5} "
-            f"{'Eagle':<6} {'In Prog':<8}"
-        )
-        print(f"  {'-'*25} {'-'*13} {'-'*4} {'-'*5} {'-'*7}")
-        for r in rows:
-            print(
-                f"  {r['scout_name'] or '':<25} {r['current_rank'] or '':<14} "
-                f"{r['total_mbs_earned'] or 0:<5} {r['eagle_mbs_earned'] or 0:<6} "
-                f"{r['mbs_in_progress'] or 0:<8}"
-            )
-
-    elif args.query_name == "mb-reqs":
-        mb_name = getattr(args, "merit_badge", None)
-        rows = mb_requirement_detail(conn, mb_name)
-        if not rows:
-            print("No MB requirement data. Run sync-scouts first (without --skip-reqs).")
-            conn.close()
-            return
-        title = mb_name if mb_name else "All In-Progress Merit Badges"
-        print(f"\nMB Requirement Detail: {title}\n")
-        print(
-            f"  {'Merit Badge':<35} {'Req':<6} {'Description':<40} "
-            f"{'Work':<5} {'Done':<5} {'Need':<5} {'%':>6}"
-        )
-        print(
-            f"  {'-'*35} {'-'*5} {'-'*40} "
-            f"{'-'*4} {'-'*4} {'-'*4} {'-'*6}"
-        )
-        for r in rows:
-            desc = (r["requirement_desc"] or "")[:38]
-            print(
-                f"  {r['merit_badge_name']:<35} "
-                f"{r['requirement_number'] or '':<6} {desc:<40} "
-                f"{r['scouts_working']:<5} {r['scouts_done']:<5} "
-                f"{r['scouts_needing']:<5} {r['pct_complete']:>5}%"
-            )
-
-    elif args.query_name == "plan":
-        rows = optimal_group_activities(conn, args.min_pct)
-        if not rows:
-            print(f"No activities found where >= {args.min_pct}% of troop benefits.")
-            print("Try a lower --min-pct or run sync-scouts to populate data.")
-            conn.close()
-            return
-        print(f"\nOptimal Group Activities (>= {args.min_pct}% of troop benefits):\n")
-        print(f"  {'Activity':<40} {'Eagle':<6} {'Benefit':<8} {'%':>6}")
-        print(f"  {'-'*40} {'-'*5} {'-'*7} {'-'*6}")
-        for r in rows:
-            eagle = " *" if r["is_eagle_required"] else ""
-            print(
-                f"  {r['activity_name']:<40} {eagle:<6} "
-                f"{r['scouts_benefiting']:<8} {r['pct_benefiting']:>5}%"
-            )
 
+def _query_next_rank(conn, args):
+    from scouting_db.queries import scouts_closest_to_next_rank
+
+    rows = scouts_closest_to_next_rank(conn)
+    if not rows:
+        return ["No data. Run sync-ranks and sync-scouts first."]
+    out = [
+        "\nScouts Closest to Next Rank:\n",
+        f"  {'Scout':<25} {'Current':<14} {'Next':<14} "
+        f"{'Done':<5} {'Left':<5} {'%':>6}",
+        f"  {'-'*25} {'-'*13} {'-'*13} {'-'*4} {'-'*4} {'-'*6}",
+    ]
+    out.extend(
+        f"  {r['scout_name']:<25} "
+        f"{(r['current_rank'] or 'None'):<14} "
+        f"{r['next_rank_name']:<14} "
+        f"{r['completed_requirements']:<5} "
+        f"{r['remaining']:<5} "
+        f"{r['pct_complete']:>5}%"
+        for r in rows
+    )
+    return out
+
+
+def _query_req_matrix(conn, args):
+    from scouting_db.queries import requirement_completion_matrix
+
+    if not args.rank_id:
+        ranks = conn.execute(
+            "SELECT id, name FROM ranks WHERE program_id = 2 ORDER BY level"
+        ).fetchall()
+        return ["Specify --rank-id. Available Scouts BSA ranks:"] + [
+            f"  {r['id']}: {r['name']}" for r in ranks
+        ]
+    rows = requirement_completion_matrix(conn, args.rank_id)
+    if not rows:
+        return ["No data for that rank."]
+    out = [
+        f"\nRequirement Completion Matrix: {rows[0]['rank_name'] or args.rank_id}\n",
+        f"  {'Req':<6} {'Description':<50} {'Need':<5} {'%':>6}",
+        f"  {'-'*5} {'-'*50} {'-'*4} {'-'*6}",
+    ]
+    out.extend(
+        f"  {r['requirement_number'] or '':<6} {(r['requirement_desc'] or '')[:48]:<50} "
+        f"{r['scouts_needing']:<5} {r['pct_incomplete']:>5}%"
+        for r in rows
+    )
+    return out
+
+
+def _query_summary(conn, args):
+    from scouting_db.queries import per_scout_summary
+
+    rows = per_scout_summary(conn)
+    if not rows:
+        return ["No Scouts in database."]
+    out = [
+        f"\nTroop Summary ({len(rows)} Scouts):\n",
+        f"  {'Scout':<25} {'Rank':<14} {'MBs':<5} "
+        f"{'Eagle':<6} {'In Prog':<8}",
+        f"  {'-'*25} {'-'*13} {'-'*4} {'-'*5} {'-'*7}",
+    ]
+    out.extend(
+        f"  {r['scout_name'] or '':<25} {r['current_rank'] or '':<14} "
+        f"{r['total_mbs_earned'] or 0:<5} {r['eagle_mbs_earned'] or 0:<6} "
+        f"{r['mbs_in_progress'] or 0:<8}"
+        for r in rows
+    )
+    return out
+
+
+def _query_mb_reqs(conn, args):
+    from scouting_db.queries import mb_requirement_detail
+
+    mb_name = getattr(args, "merit_badge", None)
+    rows = mb_requirement_detail(conn, mb_name)
+    if not rows:
+        return ["No MB requirement data. Run sync-scouts first (without --skip-reqs)."]
+    title = mb_name if mb_name else "All In-Progress Merit Badges"
+    out = [
+        f"\nMB Requirement Detail: {title}\n",
+        f"  {'Merit Badge':<35} {'Req':<6} {'Description':<40} "
+        f"{'Work':<5} {'Done':<5} {'Need':<5} {'%':>6}",
+        f"  {'-'*35} {'-'*5} {'-'*40} "
+        f"{'-'*4} {'-'*4} {'-'*4} {'-'*6}",
+    ]
+    out.extend(
+        f"  {r['merit_badge_name']:<35} "
+        f"{r['requirement_number'] or '':<6} {(r['requirement_desc'] or '')[:38]:<40} "
+        f"{r['scouts_working']:<5} {r['scouts_done']:<5} "
+        f"{r['scouts_needing']:<5} {r['pct_complete']:>5}%"
+        for r in rows
+    )
+    return out
+
+
+def _query_plan(conn, args):
+    from scouting_db.queries import optimal_group_activities
+
+    rows = optimal_group_activities(conn, args.min_pct)
+    if not rows:
+        return [
+            f"No activities found where >= {args.min_pct}% of troop benefits.",
+            "Try a lower --min-pct or run sync-scouts to populate data.",
+        ]
+    out = [
+        f"\nOptimal Group Activities (>= {args.min_pct}% of troop benefits):\n",
+        f"  {'Activity':<40} {'Eagle':<6} {'Benefit':<8} {'%':>6}",
+        f"  {'-'*40} {'-'*5} {'-'*7} {'-'*6}",
+    ]
+    out.extend(
+        f"  {r['activity_name']:<40} {' *' if r['is_eagle_required'] else '':<6} "
+        f"{r['scouts_benefiting']:<8} {r['pct_benefiting']:>5}%"
+        for r in rows
+    )
+    return out
+
+
+# Each handler returns the report as a list of lines, written in one call.
+QUERY_HANDLERS = {
+    "needs-mb": _query_needs_mb,
+    "next-rank": _query_next_rank,
+    "req-matrix": _query_req_matrix,
+    "summary": _query_summary,
+    "mb-reqs": _query_mb_reqs,
+    "plan": _query_plan,
+}
+
+
+def cmd_query(args):
+    db_path = args.db or str(DEFAULT_DB_PATH)
+    if not os.path.exists(db_path):
+        print(f"Error: database {db_path} not found. Run 'scouting init' first.", file=sys.stderr)
+        sys.exit(1)
+    conn = get_connection(args.db)
+    out = QUERY_HANDLERS[args.query_name](conn, args)
     conn.close()
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def cmd_get_token(args):
+    import getpass
+
+    from scouting_db.api import ScoutingAPIError, authenticate
+
     config_path = os.path.join(os.getcwd(), "config.json")
 
     # Load existing config so we can read saved username and preserve other keys
@@ -621,28 +765,58 @@ def main():
 
     p_init = sub.add_parser("init", help="Initialize the database")
     p_init.add_argument("troop_name", help="Name of the troop (e.g. 'Troop 42')")
-    sub.add_parser("get-token", help="Authenticate with my.scouting.org and save token to config.json")
-    sub.add_parser("sync-ranks", help="Download ranks and requirements")
+    p_init.set_defaults(func=cmd_init)
+    sub.add_parser(
+        "get-token", help="Authenticate with my.scouting.org and save token to config.json"
+    ).set_defaults(func=cmd_get_token)
+    p_ranks = sub.add_parser("sync-ranks", help="Download ranks and requirements")
+    p_ranks.add_argument(
+        "--refresh-defs", action="store_true",
+        help="Re-download requirements for every rank, even ones stored recently",
+    )
+    p_ranks.set_defaults(func=cmd_sync_ranks)
 
     p_roster = sub.add_parser(
         "import-roster", help="Import Scouts from Scoutbook CSV roster export"
     )
     p_roster.add_argument("csv_file", help="Path to roster CSV file")
+    p_roster.set_defaults(func=cmd_import_roster)
 
     p_add = sub.add_parser("add-scout", help="Manually add a single Scout")
     p_add.add_argument("user_id", help="Scout's API userId")
     p_add.add_argument("name", nargs="?", help="Scout's name ('First Last')")
+    p_add.set_defaults(func=cmd_add_scout)
 
     p_sync = sub.add_parser("sync-scouts", help="Fetch advancement data for all Scouts")
     p_sync.add_argument(
         "--skip-reqs", action="store_true",
         help="Skip fetching per-requirement MB completion (faster sync)",
     )
+    p_sync.add_argument(
+        "--jobs", type=int, default=DEFAULT_JOBS,
+        help=f"Number of Scouts to fetch concurrently (default: {DEFAULT_JOBS})",
+    )
+    p_sync.add_argument(
+        "--bulk", action="store_true",
+        help="Drop per-Scout indexes during the sync and rebuild them after "
+             "(faster for large troops)",
+    )
+    p_sync.add_argument(
+        "--max-age", type=float, default=0, metavar="HOURS",
+        help="Skip Scouts fully synced within the last HOURS hours "
+             "(default: 0, sync everyone)",
+    )
+    p_sync.add_argument(
+        "--force-profile", action="store_true",
+        help="Re-fetch every Scout's birthdate, even ones already stored",
+    )
+    p_sync.set_defaults(func=cmd_sync_scouts)
 
     p_disc = sub.add_parser(
         "discover", help="Print raw API response for a Scout (debugging)"
     )
     p_disc.add_argument("user_id", help="Scout's API userId")
+    p_disc.set_defaults(func=cmd_discover)
 
     p_query = sub.add_parser("query", help="Run a troop-wide query")
     p_query.add_argument(
@@ -661,23 +835,14 @@ def main():
         "--merit-badge", type=str, default=None,
         help="Filter by merit badge name (for mb-reqs)",
     )
+    p_query.set_defaults(func=cmd_query)
 
     args = parser.parse_args()
-    if not args.command:
+    if not hasattr(args, "func"):
         parser.print_help()
         sys.exit(0)
 
-    commands = {
-        "init": cmd_init,
-        "get-token": cmd_get_token,
-        "sync-ranks": cmd_sync_ranks,
-        "import-roster": cmd_import_roster,
-        "add-scout": cmd_add_scout,
-        "sync-scouts": cmd_sync_scouts,
-        "discover": cmd_discover,
-        "query": cmd_query,
-    }
-    commands[args.command](args)
+    args.func(args)
 
 
 if __name__ == "__main__":
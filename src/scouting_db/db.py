@@ -2,11 +2,15 @@
 
 import csv
 import sqlite3
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 DEFAULT_DB_PATH = Path.cwd() / "scouting_troop.db"
 
+# Bump whenever SCHEMA_SQL or the seed data changes; init_db re-applies both
+# to databases stamped with an older version.
+SCHEMA_VERSION = 4
+
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS settings (
     key TEXT PRIMARY KEY,
@@ -21,7 +25,8 @@ CREATE TABLE IF NOT EXISTS ranks (
     program TEXT,
     image_url TEXT,
     version TEXT,
-    active INTEGER NOT NULL DEFAULT 1
+    active INTEGER NOT NULL DEFAULT 1,
+    defs_synced_at TEXT
 );
 
 CREATE TABLE IF NOT EXISTS requirements (
@@ -57,7 +62,8 @@ CREATE TABLE IF NOT EXISTS scouts (
     patrol TEXT,
     current_rank_id INTEGER REFERENCES ranks(id),
     birthdate TEXT,
-    last_synced_at TEXT
+    last_synced_at TEXT,
+    advancements_synced_at TEXT
 );
 
 CREATE TABLE IF NOT EXISTS scout_advancements (
@@ -139,6 +145,10 @@ CREATE INDEX IF NOT EXISTS idx_scout_req_rank
     ON scout_requirement_completions(rank_id, completed);
 CREATE INDEX IF NOT EXISTS idx_scout_req_scout
     ON scout_requirement_completions(scout_user_id);
+CREATE INDEX IF NOT EXISTS idx_scout_req_requirement
+    ON scout_requirement_completions(requirement_id, completed);
+CREATE INDEX IF NOT EXISTS idx_req_rank
+    ON requirements(rank_id, parent_requirement_id);
 CREATE INDEX IF NOT EXISTS idx_mb_req_version
     ON mb_requirements(mb_api_id, mb_version_id);
 CREATE INDEX IF NOT EXISTS idx_scout_mb_req_scout
@@ -167,21 +177,119 @@ EAGLE_REQUIRED_MERIT_BADGES = [
 ]
 
 
-def get_connection(db_path=None):
+def get_connection(db_path=None, bulk=False):
+    """Open the database with the pragmas every command relies on.
+
+    *bulk* turns off fsync entirely (synchronous=OFF) for loads that are
+    cheap to redo if the machine crashes mid-write, like a roster import.
+    """
     path = db_path or str(DEFAULT_DB_PATH)
-    conn = sqlite3.connect(path)
+    # Room for every distinct statement the store helpers and report queries
+    # issue in one run, so none is re-prepared after being evicted. The
+    # transaction sqlite3 opens before the first write is BEGIN IMMEDIATE, so
+    # it takes the write lock up front instead of upgrading from a read lock
+    # (which can fail with "database is locked" while another writer is busy).
+    # Commands that interleave writes with API calls commit before each
+    # network wait, so the lock is only held while they write.
+    conn = sqlite3.connect(path, cached_statements=256, isolation_level="IMMEDIATE")
+    # Only takes effect on a new, empty database (and must precede WAL).
+    conn.execute("PRAGMA page_size=8192")
     conn.execute("PRAGMA journal_mode=WAL")
+    # WAL stays consistent at NORMAL; only the last commits can be lost on
+    # power failure, and each commit skips an fsync.
+    conn.execute("PRAGMA synchronous=OFF" if bulk else "PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # The report queries scan and join whole tables; read pages through a
+    # 256 MB memory map and keep up to 64 MB of them cached.
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
     conn.execute("PRAGMA foreign_keys=ON")
     conn.row_factory = sqlite3.Row
     return conn
 
 
+# Columns added after their table first shipped: (table, column, type).
+# CREATE TABLE IF NOT EXISTS leaves existing tables alone, so init_db adds
+# these to older databases.
+ADDED_COLUMNS = (
+    ("scouts", "advancements_synced_at", "TEXT"),
+    ("ranks", "defs_synced_at", "TEXT"),
+)
+
+# Rank requirement definitions stored more recently than this are not
+# re-downloaded by sync-ranks (unless --refresh-defs).
+RANK_DEFINITIONS_MAX_AGE = timedelta(days=7)
+
+
 def init_db(conn, troop_name=None):
-    conn.executescript(SCHEMA_SQL)
-    conn.commit()
+    """Create the schema and seed data unless the database is already current.
+
+    The schema version is kept in PRAGMA user_version, so commands run
+    against an up-to-date database skip the CREATE ... IF NOT EXISTS pass.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript(SCHEMA_SQL)
+        for table, column, col_type in ADDED_COLUMNS:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+        seed_eagle_merit_badges(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
     if troop_name is not None:
         set_setting(conn, "troop_name", troop_name)
-    seed_eagle_merit_badges(conn)
+
+
+# Per-Scout tables rewritten by every sync; see drop_indexes().
+BULK_LOAD_TABLES = (
+    "scout_advancements",
+    "scout_merit_badges",
+    "scout_requirement_completions",
+    "scout_mb_requirement_completions",
+)
+
+
+def drop_indexes(conn, tables=BULK_LOAD_TABLES):
+    """Drop the secondary indexes on *tables* and return their DDL.
+
+    Used around bulk loads so rows aren't indexed one insert at a time.
+    Indexes backing UNIQUE constraints have no DDL and are left alone (the
+    upserts depend on them). The schema version is cleared until
+    restore_indexes() runs, so if the load is interrupted the next init_db
+    recreates the dropped indexes.
+    """
+    placeholders = ", ".join("?" * len(tables))
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        f"WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+        tuple(tables),
+    ).fetchall()
+    for name, _ in rows:
+        conn.execute(f'DROP INDEX "{name}"')
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    return [sql for _, sql in rows]
+
+
+def restore_indexes(conn, ddl):
+    """Recreate indexes saved by drop_indexes() and refresh planner stats."""
+    for sql in ddl:
+        conn.execute(sql)
+    analyze(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+
+def analyze(conn):
+    """Refresh the query planner's statistics (sqlite_stat1) and commit.
+
+    Run after a sync so report and MCP queries pick the right indexes.
+    ANALYZE samples at most 1000 rows per index, so this stays cheap as the
+    per-Scout tables grow.
+    """
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.execute("ANALYZE")
+    conn.commit()
 
 
 def set_setting(conn, key, value):
@@ -194,113 +302,231 @@ def set_setting(conn, key, value):
 
 
 def seed_eagle_merit_badges(conn):
-    for name in EAGLE_REQUIRED_MERIT_BADGES:
-        conn.execute(
-            "INSERT OR IGNORE INTO merit_badges (name, is_eagle_required, active) "
-            "VALUES (?, 1, 1)",
-            (name,),
-        )
+    conn.executemany(
+        "INSERT OR IGNORE INTO merit_badges (name, is_eagle_required, active) "
+        "VALUES (?, 1, 1)",
+        [(name,) for name in EAGLE_REQUIRED_MERIT_BADGES],
+    )
     conn.commit()
 
 
-def upsert_ranks(conn, ranks_data):
-    """Insert/update ranks from API response. Returns count."""
-    ranks = ranks_data if isinstance(ranks_data, list) else ranks_data.get("value", ranks_data.get("ranks", []))
-    count = 0
-    for rank in ranks:
-        conn.execute(
-            """INSERT OR REPLACE INTO ranks
-               (id, name, level, program_id, program, image_url, version, active)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                int(rank["id"]),
-                rank["name"],
-                int(rank.get("level", 0)),
-                int(rank.get("programId", 0)),
-                rank.get("program"),
-                rank.get("imageUrl200", rank.get("imageUrl100")),
-                rank.get("version"),
-                1 if str(rank.get("active", "True")).lower() == "true" else 0,
-            ),
-        )
-        count += 1
-    conn.commit()
-    return count
+# The API sends flags as JSON booleans or as "True"/"False" strings; looking
+# the common spellings up avoids a str().lower() per row.
+_FLAG_VALUES = {True: 1, False: 0, "True": 1, "False": 0, "true": 1, "false": 0}
 
 
-def upsert_requirements(conn, rank_id, requirements):
-    """Insert/update rank requirement definitions. Returns count.
+def _flag(value):
+    """1 if an API flag is true (True, or "true" in any case), else 0."""
+    try:
+        return _FLAG_VALUES[value]
+    except (KeyError, TypeError):
+        return 1 if str(value).lower() == "true" else 0
 
-    Recursively walks nested children so all sub-requirements are stored.
-    """
-    count = 0
 
-    def _int_or_none(val):
-        return int(val) if val else None
+def _int_or_none(value):
+    return int(value) if value else None
 
-    def _walk(reqs, parent_id=None):
-        nonlocal count
-        for req in reqs:
-            req_id = req.get("id")
-            if not req_id:
-                continue
-            req_id = int(req_id)
-            parent = int(parent_id) if parent_id else None
-            conn.execute(
-                """INSERT OR REPLACE INTO requirements
-                   (id, rank_id, parent_requirement_id, requirement_number,
-                    list_number, short, name, required, children_required,
-                    sort_order, eagle_mb_required, total_mb_required,
-                    service_hours_required, months_since_last_rank)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    req_id,
-                    rank_id,
-                    parent,
-                    req.get("requirementNumber"),
-                    req.get("listNumber"),
-                    req.get("short"),
-                    req.get("name"),
-                    1 if str(req.get("required", "True")).lower() == "true" else 0,
-                    _int_or_none(req.get("childrenRequired")),
-                    req.get("sortOrder"),
-                    _int_or_none(req.get("eagleMBRequired")),
-                    _int_or_none(req.get("totalMBRequired")),
-                    _int_or_none(req.get("serviceHoursRequired")),
-                    _int_or_none(req.get("monthsSinceLastRankRequired")),
-                ),
-            )
-            count += 1
-            children = req.get("requirements") or req.get("children") or []
-            if children:
-                _walk(children, parent_id=req_id)
 
+def _iter_requirement_tree(requirements):
+    """Yield (req, req_id, parent_id) for every node of a requirement tree.
+
+    *requirements* is a list of nodes or a response dict wrapping one under
+    "requirements" or "value"; children nest under "requirements" or
+    "children". Nodes come out parents first, in document order. A node
+    without an id is skipped along with its children.
+    """
     if isinstance(requirements, dict):
         requirements = (
             requirements.get("requirements")
             or requirements.get("value")
             or []
         )
-    _walk(requirements)
-    conn.commit()
-    return count
+    # Depth-first with an explicit stack; children are pushed in reverse so
+    # nodes come out in the same order a recursive walk would produce.
+    stack = [(req, None) for req in reversed(requirements)]
+    while stack:
+        req, parent_id = stack.pop()
+        req_id = req.get("id")
+        if not req_id:
+            continue
+        req_id = int(req_id)
+        yield req, req_id, parent_id
+        children = req.get("requirements") or req.get("children") or []
+        stack.extend((child, req_id) for child in reversed(children))
+
+
+def upsert_ranks(conn, ranks_data):
+    """Insert/update ranks from API response. Returns count.
+
+    Does not commit; the caller commits.
+    """
+    ranks = ranks_data if isinstance(ranks_data, list) else ranks_data.get("value", ranks_data.get("ranks", []))
+    rows = [
+        (
+            int(rank["id"]),
+            rank["name"],
+            int(rank.get("level", 0)),
+            int(rank.get("programId", 0)),
+            rank.get("program"),
+            rank.get("imageUrl200", rank.get("imageUrl100")),
+            rank.get("version"),
+            _flag(rank.get("active", True)),
+        )
+        for rank in ranks
+    ]
+    conn.executemany(
+        """INSERT INTO ranks
+           (id, name, level, program_id, program, image_url, version, active)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(id) DO UPDATE SET
+               name = excluded.name,
+               level = excluded.level,
+               program_id = excluded.program_id,
+               program = excluded.program,
+               image_url = excluded.image_url,
+               version = excluded.version,
+               active = excluded.active""",
+        rows,
+    )
+    return len(rows)
+
+
+def upsert_requirements(conn, rank_id, requirements):
+    """Insert/update rank requirement definitions. Returns count.
+
+    Walks nested children so all sub-requirements are stored.
+    Does not commit; the caller commits.
+    """
+    rows = [
+        (
+            req_id,
+            rank_id,
+            parent_id,
+            req.get("requirementNumber"),
+            req.get("listNumber"),
+            req.get("short"),
+            req.get("name"),
+            _flag(req.get("required", True)),
+            _int_or_none(req.get("childrenRequired")),
+            req.get("sortOrder"),
+            _int_or_none(req.get("eagleMBRequired")),
+            _int_or_none(req.get("totalMBRequired")),
+            _int_or_none(req.get("serviceHoursRequired")),
+            _int_or_none(req.get("monthsSinceLastRankRequired")),
+        )
+        for req, req_id, parent_id in _iter_requirement_tree(requirements)
+    ]
+    # Parents are walked before their children, so the self-referencing
+    # parent_requirement_id foreign key is satisfied row by row.
+    conn.executemany(
+        """INSERT INTO requirements
+           (id, rank_id, parent_requirement_id, requirement_number,
+            list_number, short, name, required, children_required,
+            sort_order, eagle_mb_required, total_mb_required,
+            service_hours_required, months_since_last_rank)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(id) DO UPDATE SET
+               rank_id = excluded.rank_id,
+               parent_requirement_id = excluded.parent_requirement_id,
+               requirement_number = excluded.requirement_number,
+               list_number = excluded.list_number,
+               short = excluded.short,
+               name = excluded.name,
+               required = excluded.required,
+               children_required = excluded.children_required,
+               sort_order = excluded.sort_order,
+               eagle_mb_required = excluded.eagle_mb_required,
+               total_mb_required = excluded.total_mb_required,
+               service_hours_required = excluded.service_hours_required,
+               months_since_last_rank = excluded.months_since_last_rank""",
+        rows,
+    )
+    if rows:
+        conn.execute(
+            "UPDATE ranks SET defs_synced_at = ? WHERE id = ?",
+            (datetime.now(timezone.utc).isoformat(), rank_id),
+        )
+    return len(rows)
+
+
+def ranks_needing_requirements(conn, program_id, max_age=RANK_DEFINITIONS_MAX_AGE):
+    """Return (id, name) rows, in level order, for a program's ranks whose
+    requirement definitions were never stored or are older than *max_age*.
+
+    Pass max_age=None to return every rank.
+    """
+    sql = "SELECT id, name FROM ranks WHERE program_id = ?"
+    params = [program_id]
+    if max_age is not None:
+        sql += " AND (defs_synced_at IS NULL OR defs_synced_at < ?)"
+        params.append((datetime.now(timezone.utc) - max_age).isoformat())
+    return conn.execute(sql + " ORDER BY level", params).fetchall()
+
+
+_UPSERT_SCOUT_SQL = """
+    INSERT INTO scouts (user_id, first_name, last_name, scouting_member_id, patrol, birthdate, last_synced_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        first_name = COALESCE(excluded.first_name, first_name),
+        last_name = COALESCE(excluded.last_name, last_name),
+        scouting_member_id = COALESCE(excluded.scouting_member_id, scouting_member_id),
+        patrol = COALESCE(excluded.patrol, patrol),
+        birthdate = COALESCE(excluded.birthdate, birthdate),
+        last_synced_at = excluded.last_synced_at"""
 
 
 def upsert_scout(conn, user_id, first_name=None, last_name=None,
                   scouting_member_id=None, patrol=None, birthdate=None):
+    """Insert or update a Scout; None fields keep their stored value.
+
+    Does not commit; the caller commits.
+    """
     conn.execute(
-        """INSERT INTO scouts (user_id, first_name, last_name, scouting_member_id, patrol, birthdate, last_synced_at)
-           VALUES (?, ?, ?, ?, ?, ?, ?)
-           ON CONFLICT(user_id) DO UPDATE SET
-               first_name = COALESCE(excluded.first_name, first_name),
-               last_name = COALESCE(excluded.last_name, last_name),
-               scouting_member_id = COALESCE(excluded.scouting_member_id, scouting_member_id),
-               patrol = COALESCE(excluded.patrol, patrol),
-               birthdate = COALESCE(excluded.birthdate, birthdate),
-               last_synced_at = excluded.last_synced_at""",
+        _UPSERT_SCOUT_SQL,
         (user_id, first_name, last_name, scouting_member_id, patrol, birthdate,
          datetime.now(timezone.utc).isoformat()),
     )
+
+
+def mark_scout_synced(conn, user_id):
+    """Record that a Scout's advancement data was fully synced just now.
+
+    Does not commit; the caller commits.
+    """
+    conn.execute(
+        "UPDATE scouts SET advancements_synced_at = ? WHERE user_id = ?",
+        (datetime.now(timezone.utc).isoformat(), user_id),
+    )
+
+
+def begin_scout_writes(conn):
+    """Open a savepoint for one Scout's writes within the uncommitted batch.
+
+    The batch transaction is opened first if needed, so that
+    end_scout_writes() doesn't commit on its own. Does not commit; the
+    caller commits.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    conn.execute("SAVEPOINT scout")
+
+
+def end_scout_writes(conn):
+    """Keep the current Scout's writes in the batch (see begin_scout_writes)."""
+    conn.execute("RELEASE scout")
+
+
+def commit_completed_scouts(conn):
+    """Undo the current Scout's writes and commit the Scouts before it.
+
+    Used when a sync stops for any reason partway through its loop. If it
+    stops between Scouts (no savepoint open), this just commits.
+    """
+    try:
+        conn.execute("ROLLBACK TO scout")
+        conn.execute("RELEASE scout")
+    except sqlite3.OperationalError:
+        pass  # no such savepoint
     conn.commit()
 
 
@@ -316,10 +542,12 @@ def import_roster_csv(conn, csv_path):
     Returns (imported_count, skipped_count).
     """
     with open(csv_path, newline="", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames or []
+        reader = csv.reader(f)
+        headers = next(reader, [])
 
-        header_map = {h.strip().lower().replace(" ", "_"): h for h in headers}
+        # Column positions are resolved once from the header row; data rows
+        # are then read positionally rather than as a dict per row.
+        header_map = {h.strip().lower().replace(" ", "_"): i for i, h in enumerate(headers)}
 
         def _find_col(*candidates):
             for c in candidates:
@@ -335,23 +563,36 @@ def import_roster_csv(conn, csv_path):
         )
         col_first = _find_col("first_name", "first", "firstname")
         col_last = _find_col("last_name", "last", "lastname")
-        col_name = _find_col("name", "scout_name", "scoutname") if not col_first and not col_last else None
+        col_name = (
+            _find_col("name", "scout_name", "scoutname")
+            if col_first is None and col_last is None else None
+        )
         col_patrol = _find_col("patrol", "patrol_name", "patrolname")
         col_type = _find_col("type", "member_type", "membertype")
 
-        if not col_user_id and not col_member_id:
+        if col_user_id is None and col_member_id is None:
             raise ValueError(
                 f"CSV must have a 'User ID' or 'Scouting Member ID' column. "
                 f"Found columns: {headers}"
             )
 
-        imported = 0
+        def _cell(row, col):
+            """Stripped value of *col* in *row* ("" if absent), or None if
+            the CSV has no such column."""
+            if col is None:
+                return None
+            return row[col].strip() if col < len(row) else ""
+
+        synced_at = datetime.now(timezone.utc).isoformat()
+        rows = []
         skipped = 0
         for row in reader:
-            uid = (row.get(col_user_id) or "").strip() if col_user_id else ""
-            mid = (row.get(col_member_id) or "").strip() if col_member_id else ""
+            if not row:
+                continue  # blank line (DictReader skipped these too)
+            uid = _cell(row, col_user_id) or ""
+            mid = _cell(row, col_member_id) or ""
 
-            if col_type and (row.get(col_type) or "").strip().upper() != "YOUTH":
+            if col_type is not None and _cell(row, col_type).upper() != "YOUTH":
                 skipped += 1
                 continue
 
@@ -359,21 +600,30 @@ def import_roster_csv(conn, csv_path):
                 skipped += 1
                 continue
 
-            primary_id = uid or mid
-            if col_name:
-                full = (row.get(col_name) or "").strip()
-                parts = full.split(" ", 1)
+            if col_name is not None:
+                parts = _cell(row, col_name).split(" ", 1)
                 first = parts[0] or None
                 last = parts[1] if len(parts) > 1 else None
             else:
-                first = (row.get(col_first) or "").strip() if col_first else None
-                last = (row.get(col_last) or "").strip() if col_last else None
+                first = _cell(row, col_first)
+                last = _cell(row, col_last)
 
-            patrol = (row.get(col_patrol) or "").strip() if col_patrol else None
-            upsert_scout(conn, primary_id, first, last, mid or None, patrol or None)
-            imported += 1
+            patrol = _cell(row, col_patrol)
+            rows.append((uid or mid, first, last, mid or None, patrol or None,
+                         None, synced_at))
 
-        return imported, skipped
+    conn.executemany(_UPSERT_SCOUT_SQL, rows)
+    conn.commit()
+    return len(rows), skipped
+
+
+# The requirement-definition and per-Scout store helpers below don't commit:
+# a sync writes many of them per Scout, and the caller commits once per batch
+# of Scouts so the whole batch shares a single transaction.
+#
+# Most per-Scout rows are unchanged from one sync to the next, so their
+# upserts only update when a value differs (the WHERE ... IS NOT excluded
+# clauses); an unchanged row costs no page write or WAL frame.
 
 
 def store_youth_ranks(conn, user_id, ranks_response):
@@ -382,7 +632,8 @@ def store_youth_ranks(conn, user_id, ranks_response):
     Response shape: {"status": "All", "program": [{"programId": 2, "ranks": [...]}]}
     """
     max_bsa_rank_id = 0
-    total = 0
+    rank_rows = []
+    advancement_rows = []
     programs = ranks_response.get("program") or []
     for prog in programs:
         prog_id = prog.get("programId") or 0
@@ -395,34 +646,39 @@ def store_youth_ranks(conn, user_id, ranks_response):
             name = rank.get("name") or ""
             date_earned = rank.get("dateEarned")
             status = "completed" if date_earned else "in_progress"
-            total += 1
 
-            # Ensure rank exists in ranks table before FK references
-            conn.execute(
-                """INSERT OR IGNORE INTO ranks (id, name, level, program_id, program, active)
-                   VALUES (?, ?, ?, ?, ?, 1)""",
-                (rank_id, name, rank_id, prog_id, prog_name),
-            )
-
-            conn.execute(
-                """INSERT OR REPLACE INTO scout_advancements
-                   (scout_user_id, advancement_type, advancement_id,
-                    advancement_name, status, date_completed)
-                   VALUES (?, 'rank', ?, ?, ?, ?)""",
-                (user_id, rank_id, name, status, date_earned),
-            )
+            rank_rows.append((rank_id, name, rank_id, prog_id, prog_name))
+            advancement_rows.append((user_id, rank_id, name, status, date_earned))
 
             # Only track Scouts BSA ranks (programId 2) for current rank
             if date_earned and prog_id == 2 and rank_id > max_bsa_rank_id:
                 max_bsa_rank_id = rank_id
 
+    # Ensure ranks exist in the ranks table before anything references them
+    conn.executemany(
+        """INSERT OR IGNORE INTO ranks (id, name, level, program_id, program, active)
+           VALUES (?, ?, ?, ?, ?, 1)""",
+        rank_rows,
+    )
+    conn.executemany(
+        """INSERT INTO scout_advancements
+           (scout_user_id, advancement_type, advancement_id,
+            advancement_name, status, date_completed)
+           VALUES (?, 'rank', ?, ?, ?, ?)
+           ON CONFLICT(scout_user_id, advancement_type, advancement_id) DO UPDATE SET
+               advancement_name = excluded.advancement_name,
+               status = excluded.status,
+               date_completed = excluded.date_completed
+           WHERE (advancement_name, status, date_completed)
+               IS NOT (excluded.advancement_name, excluded.status, excluded.date_completed)""",
+        advancement_rows,
+    )
     if max_bsa_rank_id:
         conn.execute(
             "UPDATE scouts SET current_rank_id = ? WHERE user_id = ?",
             (max_bsa_rank_id, user_id),
         )
-    conn.commit()
-    return total
+    return len(advancement_rows)
 
 
 def store_youth_merit_badges(conn, user_id, mb_response):
@@ -432,6 +688,8 @@ def store_youth_merit_badges(conn, user_id, mb_response):
     """
     items = mb_response if isinstance(mb_response, list) else []
     earned = 0
+    scout_rows = []
+    eagle_flags = {}  # name -> is_eagle, so a repeated badge is upserted once
     for item in items:
         name = item.get("name") or item.get("short")
         if not name:
@@ -451,182 +709,192 @@ def store_youth_merit_badges(conn, user_id, mb_response):
         mb_api_id = item.get("id")
         mb_version_id = str(item["versionId"]) if item.get("versionId") else None
 
-        conn.execute(
-            """INSERT OR REPLACE INTO scout_merit_badges
-               (scout_user_id, merit_badge_name, status, date_completed,
-                date_started, mb_api_id, mb_version_id)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (user_id, name, status, date_completed, date_started, mb_api_id, mb_version_id),
+        scout_rows.append(
+            (user_id, name, status, date_completed, date_started, mb_api_id, mb_version_id)
         )
+        eagle_flags[name] = is_eagle
 
-        conn.execute(
-            """INSERT INTO merit_badges (name, is_eagle_required, active)
-               VALUES (?, ?, 1)
-               ON CONFLICT(name) DO UPDATE SET is_eagle_required = excluded.is_eagle_required""",
-            (name, is_eagle),
-        )
-
-    conn.commit()
+    conn.executemany(
+        """INSERT INTO scout_merit_badges
+           (scout_user_id, merit_badge_name, status, date_completed,
+            date_started, mb_api_id, mb_version_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(scout_user_id, merit_badge_name) DO UPDATE SET
+               status = excluded.status,
+               date_completed = excluded.date_completed,
+               date_started = excluded.date_started,
+               mb_api_id = excluded.mb_api_id,
+               mb_version_id = excluded.mb_version_id
+           WHERE (status, date_completed, date_started, mb_api_id, mb_version_id)
+               IS NOT (excluded.status, excluded.date_completed, excluded.date_started,
+                       excluded.mb_api_id, excluded.mb_version_id)""",
+        scout_rows,
+    )
+    conn.executemany(
+        """INSERT INTO merit_badges (name, is_eagle_required, active)
+           VALUES (?, ?, 1)
+           ON CONFLICT(name) DO UPDATE SET is_eagle_required = excluded.is_eagle_required""",
+        list(eagle_flags.items()),
+    )
     return earned, len(items)
 
 
-
-
 def upsert_mb_requirements(conn, mb_api_id, mb_version_id, requirements):
     """Insert/update MB requirement definitions. Returns count."""
-    count = 0
-
-    def _walk(reqs, parent_id=None):
-        nonlocal count
-        for req in reqs:
-            req_id = req.get("id")
-            if not req_id:
-                continue
-            req_id = int(req_id)
-            parent = int(parent_id) if parent_id else None
-            conn.execute(
-                """INSERT OR REPLACE INTO mb_requirements
-                   (id, mb_api_id, mb_version_id, parent_requirement_id,
-                    requirement_number, name, required, children_required,
-                    sort_order)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    req_id,
-                    mb_api_id,
-                    str(mb_version_id),
-                    parent,
-                    req.get("requirementNumber"),
-                    req.get("name"),
-                    1 if str(req.get("required", "True")).lower() == "true" else 0,
-                    int(req["childrenRequired"]) if req.get("childrenRequired") else None,
-                    req.get("sortOrder"),
-                ),
-            )
-            count += 1
-            children = req.get("requirements") or req.get("children") or []
-            if children:
-                _walk(children, parent_id=req_id)
-
-    if isinstance(requirements, dict):
-        requirements = (
-            requirements.get("requirements")
-            or requirements.get("value")
-            or []
+    mb_version_id = str(mb_version_id)
+    rows = [
+        (
+            req_id,
+            mb_api_id,
+            mb_version_id,
+            parent_id,
+            req.get("requirementNumber"),
+            req.get("name"),
+            _flag(req.get("required", True)),
+            _int_or_none(req.get("childrenRequired")),
+            req.get("sortOrder"),
         )
-    _walk(requirements)
-    conn.commit()
-    return count
+        for req, req_id, parent_id in _iter_requirement_tree(requirements)
+    ]
+    conn.executemany(
+        """INSERT INTO mb_requirements
+           (id, mb_api_id, mb_version_id, parent_requirement_id,
+            requirement_number, name, required, children_required,
+            sort_order)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(id) DO UPDATE SET
+               mb_api_id = excluded.mb_api_id,
+               mb_version_id = excluded.mb_version_id,
+               parent_requirement_id = excluded.parent_requirement_id,
+               requirement_number = excluded.requirement_number,
+               name = excluded.name,
+               required = excluded.required,
+               children_required = excluded.children_required,
+               sort_order = excluded.sort_order""",
+        rows,
+    )
+    return len(rows)
 
 
 def store_youth_mb_requirements(conn, user_id, mb_api_id, mb_version_id, requirements):
     """Store per-Scout MB requirement completion. Returns count."""
-    count = 0
-
-    def _walk(reqs):
-        nonlocal count
-        for req in reqs:
-            req_id = req.get("id")
-            if not req_id:
-                continue
-            req_id = int(req_id)
-            date_completed = req.get("dateCompleted") or req.get("dateEarned")
-            completed = 1 if date_completed else 0
-            conn.execute(
-                """INSERT OR REPLACE INTO scout_mb_requirement_completions
-                   (scout_user_id, mb_requirement_id, mb_api_id, mb_version_id,
-                    completed, date_completed)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (
-                    user_id,
-                    req_id,
-                    mb_api_id,
-                    str(mb_version_id),
-                    completed,
-                    date_completed,
-                ),
-            )
-            count += 1
-            children = req.get("requirements") or req.get("children") or []
-            if children:
-                _walk(children)
-
-    if isinstance(requirements, dict):
-        requirements = (
-            requirements.get("requirements")
-            or requirements.get("value")
-            or []
-        )
-    _walk(requirements)
-    conn.commit()
-    return count
+    rows = []
+    mb_version_id = str(mb_version_id)
+    for req, req_id, _ in _iter_requirement_tree(requirements):
+        date_completed = req.get("dateCompleted") or req.get("dateEarned")
+        rows.append((
+            user_id,
+            req_id,
+            mb_api_id,
+            mb_version_id,
+            1 if date_completed else 0,
+            date_completed,
+        ))
+    conn.executemany(
+        """INSERT INTO scout_mb_requirement_completions
+           (scout_user_id, mb_requirement_id, mb_api_id, mb_version_id,
+            completed, date_completed)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(scout_user_id, mb_requirement_id) DO UPDATE SET
+               mb_api_id = excluded.mb_api_id,
+               mb_version_id = excluded.mb_version_id,
+               completed = excluded.completed,
+               date_completed = excluded.date_completed
+           WHERE (mb_api_id, mb_version_id, completed, date_completed)
+               IS NOT (excluded.mb_api_id, excluded.mb_version_id,
+                       excluded.completed, excluded.date_completed)""",
+        rows,
+    )
+    return len(rows)
 
 
 def store_youth_rank_requirements(conn, user_id, rank_id, requirements):
     """Store per-Scout rank requirement completion. Returns count."""
-    count = 0
-
-    def _walk(reqs):
-        nonlocal count
-        for req in reqs:
-            req_id = req.get("id")
-            if not req_id:
-                continue
-            req_id = int(req_id)
-            date_completed = req.get("dateCompleted") or req.get("dateEarned")
-            completed = 1 if date_completed else 0
-            conn.execute(
-                """INSERT OR REPLACE INTO scout_requirement_completions
-                   (scout_user_id, requirement_id, rank_id,
-                    completed, date_completed)
-                   VALUES (?, ?, ?, ?, ?)""",
-                (user_id, req_id, rank_id, completed, date_completed),
-            )
-            count += 1
-            children = req.get("requirements") or req.get("children") or []
-            if children:
-                _walk(children)
-
-    if isinstance(requirements, dict):
-        requirements = (
-            requirements.get("requirements")
-            or requirements.get("value")
-            or []
-        )
-    _walk(requirements)
-    conn.commit()
-    return count
+    rows = []
+    for req, req_id, _ in _iter_requirement_tree(requirements):
+        date_completed = req.get("dateCompleted") or req.get("dateEarned")
+        rows.append((
+            user_id,
+            req_id,
+            rank_id,
+            1 if date_completed else 0,
+            date_completed,
+        ))
+    conn.executemany(
+        """INSERT INTO scout_requirement_completions
+           (scout_user_id, requirement_id, rank_id,
+            completed, date_completed)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT(scout_user_id, requirement_id) DO UPDATE SET
+               rank_id = excluded.rank_id,
+               completed = excluded.completed,
+               date_completed = excluded.date_completed
+           WHERE (rank_id, completed, date_completed)
+               IS NOT (excluded.rank_id, excluded.completed, excluded.date_completed)""",
+        rows,
+    )
+    return len(rows)
 
 
 def store_leadership(conn, user_id, positions):
     """Store leadership position history. Returns count."""
     if not isinstance(positions, list):
         positions = positions.get("value", positions.get("positions", []))
-    count = 0
-    for pos in positions:
-        position_name = (
-            pos.get("positionTitle")
-            or pos.get("position")
-            or pos.get("title")
-            or "Unknown"
-        )
-        conn.execute(
-            """INSERT OR REPLACE INTO scout_leadership
-               (scout_user_id, position, start_date, end_date,
-                unit, patrol, days_in_position, approved)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+    rows = [
+        (
+            user_id,
             (
-                user_id,
-                position_name,
-                pos.get("dateStarted") or pos.get("startDate"),
-                pos.get("dateEnded") or pos.get("endDate"),
-                pos.get("unit"),
-                pos.get("patrol"),
-                pos.get("numberOfDaysInPosition") or pos.get("daysInPosition"),
-                1 if pos.get("approvalStatus") or pos.get("approved") else 0,
+                pos.get("positionTitle")
+                or pos.get("position")
+                or pos.get("title")
+                or "Unknown"
             ),
+            pos.get("dateStarted") or pos.get("startDate"),
+            pos.get("dateEnded") or pos.get("endDate"),
+            pos.get("unit"),
+            pos.get("patrol"),
+            pos.get("numberOfDaysInPosition") or pos.get("daysInPosition"),
+            1 if pos.get("approvalStatus") or pos.get("approved") else 0,
         )
-        count += 1
-    conn.commit()
-    return count
+        for pos in positions
+    ]
+    # scout_leadership has no unique key, so there is no conflict to resolve.
+    conn.executemany(
+        """INSERT INTO scout_leadership
+           (scout_user_id, position, start_date, end_date,
+            unit, patrol, days_in_position, approved)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    return len(rows)
+
+
+def stored_definitions(conn):
+    """Return (rank_ids, mb_versions) of requirement definitions on disk.
+
+    rank_ids is the set of ranks with stored requirements; mb_versions maps
+    each merit badge's API id to the set of version ids stored for it.
+    """
+    rank_ids = {
+        row[0] for row in conn.execute("SELECT DISTINCT rank_id FROM requirements")
+    }
+    mb_versions = {}
+    for mb_api_id, version_id in conn.execute(
+        "SELECT DISTINCT mb_api_id, mb_version_id FROM mb_requirements"
+    ):
+        mb_versions.setdefault(mb_api_id, set()).add(version_id)
+    return rank_ids, mb_versions
 
 
+def _version_key(version_id):
+    version_id = str(version_id or "")
+    return (version_id.isdigit(), int(version_id) if version_id.isdigit() else 0, version_id)
+
+
+def latest_mb_version(versions):
+    """Return the newest of a merit badge's stored version ids.
+
+    Version ids are numeric strings, so they're compared as numbers ("10"
+    is newer than "9"); any non-numeric id counts as older than those.
+    """
+    return max(versions, key=_version_key)
@@ -1,21 +1,36 @@
 """MCP server exposing Scouting troop SQLite database to Claude."""
 
+import itertools
 import json
 import os
 import sqlite3
+import threading
 
 from mcp.server.fastmcp import FastMCP
 
 DB_PATH = os.environ.get("BSA_DB_PATH", "scouting_troop.db")
+DEFAULT_QUERY_LIMIT = 1000
 
 mcp = FastMCP("scouting")
 
+# One read-only connection serves every tool call, so a call doesn't pay to
+# reopen the file and its WAL. Tools may run on worker threads; the lock
+# keeps them to one at a time on the shared connection.
+_conn = None
+_conn_lock = threading.Lock()
+
 
 def _connect() -> sqlite3.Connection:
-    """Open a read-only connection to the database."""
-    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return the shared read-only connection, opening it on first use.
+
+    Call with _conn_lock held.
+    """
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(
+            f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False
+        )
+    return _conn
 
 
 @mcp.tool()
@@ -24,28 +39,45 @@ def schema() -> str:
 
     Call this first to understand the database structure before writing queries.
     """
-    conn = _connect()
-    try:
-        rows = conn.execute(
+    with _conn_lock:
+        rows = _connect().execute(
             "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name"
         ).fetchall()
-        return "\n\n".join(row["sql"] for row in rows)
-    finally:
-        conn.close()
+    return "\n\n".join(row[0] for row in rows)
 
 
 @mcp.tool()
-def query(sql: str) -> str:
+def query(sql: str, limit: int = DEFAULT_QUERY_LIMIT) -> str:
     """Execute a read-only SQL query and return results as JSON.
 
     The database is opened in read-only mode so only SELECT statements will work.
+    At most `limit` rows are returned (0 for no limit); when more rows match,
+    a note after the JSON says so. Use LIMIT/OFFSET in the SQL to page through
+    large results.
     """
-    conn = _connect()
-    try:
-        rows = conn.execute(sql).fetchall()
-        return json.dumps([dict(row) for row in rows], default=str)
-    finally:
-        conn.close()
+    with _conn_lock:
+        conn = _connect()
+        try:
+            # Plain tuples zipped with the column names once, rather than a
+            # sqlite3.Row per row that is then copied into a dict.
+            cur = conn.execute(sql)
+            keys = [col[0] for col in cur.description or ()]
+            # Stepping stops once the limit is reached, so a huge result is
+            # never read in full.
+            rows = [
+                dict(zip(keys, row))
+                for row in itertools.islice(cur, limit if limit > 0 else None)
+            ]
+            truncated = limit > 0 and cur.fetchone() is not None
+        finally:
+            # A query that opened a transaction (e.g. BEGIN) would otherwise
+            # pin every later call to its snapshot of the database.
+            if conn.in_transaction:
+                conn.rollback()
+    out = json.dumps(rows, default=str)
+    if truncated:
+        out += f"\n(Only the first {limit} rows are shown; the query returned more.)"
+    return out
 
 
 def main():
@@ -5,7 +5,9 @@ bundled, or directly via `uv run python -m scouting_db.native_sync` in dev).
 
 Outputs JSON-newline progress messages to stdout so the Electron renderer can
 display live status. Password is read from the SCOUTING_PASSWORD env var
-and never passed on the command line.
+and never passed on the command line. Setting SCOUTING_SYNC_QUIET=1 (e.g.
+for scripted or test runs nobody watches) drops the step and log lines;
+errors and the final complete message are still written.
 
 Exit codes:
   0 — success
@@ -13,6 +15,7 @@ Exit codes:
 """
 
 import argparse
+import concurrent.futures
 import json
 import os
 import sys
@@ -20,9 +23,29 @@ import sys
 
 # ─── Progress helpers ────────────────────────────────────────────────────────
 
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+# Off for the Electron app, which shows every line.
+_QUIET = os.environ.get("SCOUTING_SYNC_QUIET") == "1"
+_PROGRESS_TYPES = frozenset({"step", "log", "logs"})
+# Per-Scout lines queued by queue_log(), written as one "logs" message.
+_log_buffer: list[str] = []
+# The sync loop flushes queued lines after this many Scouts.
+LOG_BATCH_SIZE = 10
+
+
 def _emit(msg_type: str, **kwargs) -> None:
-    """Print a JSON progress line to stdout and flush immediately."""
-    print(json.dumps({"type": msg_type, **kwargs}), flush=True)
+    """Write a JSON progress line to stdout and flush immediately.
+
+    Every line is flushed, since the renderer shows each one as it arrives.
+    Progress lines are skipped entirely when _QUIET. Lines still queued by
+    queue_log() are written first, so messages stay in order.
+    """
+    if _QUIET and msg_type in _PROGRESS_TYPES:
+        return
+    if _log_buffer and msg_type != "logs":
+        _flush_logs()
+    sys.stdout.write(_ENCODER.encode({"type": msg_type, **kwargs}) + "\n")
+    sys.stdout.flush()
 
 
 def step(message: str) -> None:
@@ -33,6 +56,19 @@ def log(message: str) -> None:
     _emit("log", message=message)
 
 
+def queue_log(message: str) -> None:
+    """Queue a routine log line to be written with the next batch."""
+    if not _QUIET:
+        _log_buffer.append(message)
+
+
+def _flush_logs() -> None:
+    if _log_buffer:
+        messages = _log_buffer[:]
+        _log_buffer.clear()
+        _emit("logs", messages=messages)
+
+
 def error(message: str) -> None:
     _emit("error", message=message)
 
@@ -54,6 +90,10 @@ def main() -> None:
     parser.add_argument("--csv-path",    default=None,  help="Path to Scoutbook roster CSV (optional)")
     parser.add_argument("--skip-reqs",   action="store_true",
                         help="Skip per-requirement completion sync (faster)")
+    parser.add_argument("--force-profile", action="store_true",
+                        help="Re-fetch birthdates already stored")
+    parser.add_argument("--refresh-defs", action="store_true",
+                        help="Re-download rank requirements stored recently")
     args = parser.parse_args()
 
     password = os.environ.get("SCOUTING_PASSWORD", "")
@@ -71,6 +111,7 @@ def main() -> None:
     step(f"Authenticating as {args.username}…")
     try:
         from scouting_db.api import ScoutingAPI, ScoutingAPIError, authenticate
+        from scouting_db.sync import SYNC_COMMIT_INTERVAL, fetch_scouts
     except ImportError as exc:
         error(f"Import error — packaging issue: {exc}")
         sys.exit(1)
@@ -101,11 +142,14 @@ def main() -> None:
     step("Initialising database…")
     try:
         from scouting_db.db import (
-            get_connection, init_db, import_roster_csv,
-            store_leadership, store_youth_mb_requirements,
-            store_youth_merit_badges, store_youth_rank_requirements,
-            store_youth_ranks, upsert_mb_requirements,
-            upsert_ranks, upsert_requirements, upsert_scout,
+            RANK_DEFINITIONS_MAX_AGE, analyze, begin_scout_writes,
+            commit_completed_scouts, end_scout_writes, get_connection,
+            init_db, import_roster_csv, latest_mb_version,
+            ranks_needing_requirements, store_leadership,
+            store_youth_mb_requirements, store_youth_merit_badges,
+            store_youth_rank_requirements, store_youth_ranks,
+            stored_definitions, upsert_mb_requirements, upsert_ranks,
+            upsert_requirements, upsert_scout,
         )
     except ImportError as exc:
         error(f"Import error: {exc}")
@@ -117,23 +161,33 @@ def main() -> None:
     # ── Step 3: Sync rank definitions (public, no auth needed) ───────────────
     step("Downloading rank definitions…")
     try:
-        api = ScoutingAPI(token=token)
+        # Keep the definition cache beside config.json in the app's data dir
+        cache_path = os.path.join(os.path.dirname(args.config_path), "http-cache.db")
+        api = ScoutingAPI(token=token, cache_path=cache_path)
         ranks_data = api.get_ranks(program_id=2)
         count = upsert_ranks(conn, ranks_data)
+        conn.commit()  # don't hold the write lock across the requirement fetches
         log(f"  {count} ranks stored")
 
-        rank_rows = conn.execute(
-            "SELECT id, name FROM ranks WHERE program_id = 2 ORDER BY level"
-        ).fetchall()
-        for row in rank_rows:
+        # Requirements stored within the last week are kept unless
+        # --refresh-defs.
+        rank_rows = ranks_needing_requirements(
+            conn, 2, None if args.refresh_defs else RANK_DEFINITIONS_MAX_AGE
+        )
+        # All ranks are requested at once; results are stored in rank order
+        # on this thread.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(rank_rows))) as pool:
+            futures = [pool.submit(api.get_rank_requirements, rank_id) for rank_id, _ in rank_rows]
+        for (rank_id, _), fut in zip(rank_rows, futures):
             try:
-                data = api.get_rank_requirements(row["id"])
+                data = fut.result()
                 reqs = data.get("requirements", data.get("value", []))
                 if isinstance(reqs, dict):
                     reqs = reqs.get("requirements", [])
-                upsert_requirements(conn, row["id"], reqs)
+                upsert_requirements(conn, rank_id, reqs)
             except ScoutingAPIError:
                 pass  # Non-fatal; rank definitions may already exist
+        conn.commit()
         log("  Rank requirements stored")
     except ScoutingAPIError as exc:
         log(f"  Warning: could not sync ranks ({exc.status_code}) — continuing")
@@ -148,14 +202,18 @@ def main() -> None:
             log(f"  Warning: roster import failed: {exc}")
 
     # ── Step 5: Sync advancement data ────────────────────────────────────────
-    scouts = conn.execute(
-        "SELECT user_id, first_name, last_name FROM scouts"
+    # Plain tuples: the roster is unpacked by position below.
+    cur = conn.cursor()
+    cur.row_factory = None
+    scouts = cur.execute(
+        "SELECT user_id, first_name, last_name, birthdate FROM scouts"
     ).fetchall()
 
     if not scouts:
         log("No Scouts in database.")
         if not args.csv_path:
             log("Tip: import a roster CSV to add Scouts (Scoutbook → Reports → Export CSV).")
+        api.close()
         conn.close()
         complete(args.db_path)
         return
@@ -163,100 +221,114 @@ def main() -> None:
     total = len(scouts)
     step(f"Syncing advancement data for {total} Scout{'s' if total != 1 else ''}…")
 
-    SCOUTS_BSA_PROGRAM_ID = 2
-    mb_defn_cache: dict = {}    # mb_id -> version_id (already stored)
-    rank_defn_cache: set = set()  # rank_ids already stored
+    # Requirement definitions already on disk (including the rank ones
+    # stored in step 3) aren't fetched again; ones fetched during this sync
+    # are stored once.
+    rank_defn_cache, stored_mb_versions = stored_definitions(conn)
+    mb_defn_cache: dict = {}  # mb_id -> version_id stored during this sync
+
+    # Scouts are fetched concurrently; results arrive here in roster order so
+    # every database write stays on this thread.
+    uids = [uid for uid, _, _, _ in scouts]
+    # Birthdates don't change, so only Scouts without one get a profile fetch.
+    have_birthdate = () if args.force_profile else [
+        uid for uid, _, _, birthdate in scouts if birthdate
+    ]
+    fetches = fetch_scouts(
+        api, uids, skip_reqs=args.skip_reqs,
+        stored_defs=(rank_defn_cache, stored_mb_versions),
+        skip_profile=have_birthdate,
+        # Commit rather than hold the write lock while the next Scout is
+        # still on the network; back-to-back results share one commit.
+        before_wait=conn.commit,
+    )
+    try:
+        for i, ((uid, first, last, _), fetched) in enumerate(zip(scouts, fetches), 1):
+            name = f"{first or ''} {last or ''}".strip() or str(uid)
+            queue_log(f"  [{i}/{total}] {name}")
+            # One savepoint per Scout, so stopping mid-Scout keeps the others.
+            begin_scout_writes(conn)
+
+            # Ranks
+            try:
+                store_youth_ranks(conn, uid, fetched.parts["ranks"].result())
+            except ScoutingAPIError as exc:
+                if exc.status_code == 401:
+                    error("Token expired mid-sync. Please re-authenticate.")
+                    sys.exit(1)
+                log(f"    ⚠ ranks: HTTP {exc.status_code}")
+
+            # Rank requirement completions (in-progress ranks only)
+            for rank_id, result in fetched.rank_reqs:
+                try:
+                    defn, youth_reqs = result.result()
+                    if rank_id not in rank_defn_cache:
+                        upsert_requirements(conn, rank_id, defn)
+                        rank_defn_cache.add(rank_id)
+                    store_youth_rank_requirements(conn, uid, rank_id, youth_reqs)
+                except ScoutingAPIError:
+                    pass
 
-    for i, scout in enumerate(scouts, 1):
-        uid = scout["user_id"]
-        name = f"{scout['first_name'] or ''} {scout['last_name'] or ''}".strip() or str(uid)
-        log(f"  [{i}/{total}] {name}")
+            # Merit badges
+            try:
+                store_youth_merit_badges(conn, uid, fetched.parts["merit_badges"].result())
+            except ScoutingAPIError as exc:
+                log(f"    ⚠ merit badges: HTTP {exc.status_code}")
 
-        # Ranks
-        ranks_data = None
-        try:
-            ranks_data = api.get_youth_ranks(uid)
-            store_youth_ranks(conn, uid, ranks_data)
-        except ScoutingAPIError as exc:
-            if exc.status_code == 401:
-                error("Token expired mid-sync. Please re-authenticate.")
-                conn.close()
-                sys.exit(1)
-            log(f"    ⚠ ranks: HTTP {exc.status_code}")
-
-        # Rank requirement completions (in-progress ranks only)
-        if not args.skip_reqs and ranks_data:
-            for prog in ranks_data.get("program") or []:
-                if prog.get("programId") != SCOUTS_BSA_PROGRAM_ID:
-                    continue
-                for rank in prog.get("ranks") or []:
-                    if rank.get("dateEarned") or rank.get("dateCompleted"):
-                        continue
-                    rank_id = rank.get("id")
-                    if not rank_id:
-                        continue
-                    rank_id = int(rank_id)
-                    try:
-                        if rank_id not in rank_defn_cache:
-                            defn = api.get_rank_requirements(rank_id)
-                            upsert_requirements(conn, rank_id, defn)
-                            rank_defn_cache.add(rank_id)
-                        youth_reqs = api.get_youth_rank_requirements(uid, rank_id)
-                        store_youth_rank_requirements(conn, uid, rank_id, youth_reqs)
-                    except ScoutingAPIError:
-                        pass
-
-        # Merit badges
-        mb_data = None
-        try:
-            mb_data = api.get_youth_merit_badges(uid)
-            store_youth_merit_badges(conn, uid, mb_data)
-        except ScoutingAPIError as exc:
-            log(f"    ⚠ merit badges: HTTP {exc.status_code}")
-
-        # MB requirement completions (in-progress MBs only)
-        if not args.skip_reqs and mb_data:
-            in_progress = [
-                mb for mb in (mb_data if isinstance(mb_data, list) else [])
-                if not (mb.get("dateCompleted") or mb.get("dateEarned"))
-            ]
-            for mb in in_progress:
-                mb_id = mb.get("id")
-                if not mb_id:
-                    continue
+            # MB requirement completions (in-progress MBs only)
+            for mb, result in fetched.mb_reqs:
+                mb_id = mb["id"]
                 try:
-                    if mb_id not in mb_defn_cache:
-                        defn = api.get_mb_requirements(mb_id)
-                        version_id = defn.get("versionId") or mb.get("versionId") or ""
-                        upsert_mb_requirements(conn, mb_id, version_id, defn)
-                        mb_defn_cache[mb_id] = version_id
-                    youth_reqs = api.get_youth_mb_requirements(uid, mb_id)
-                    version_id = mb_defn_cache.get(mb_id) or mb.get("versionId") or ""
+                    defn, youth_reqs = result.result()
+                    if defn is None:  # already on disk
+                        version_id = mb.get("versionId") or latest_mb_version(stored_mb_versions[mb_id])
+                    else:
+                        if mb_id not in mb_defn_cache:
+                            version_id = defn.get("versionId") or mb.get("versionId") or ""
+                            upsert_mb_requirements(conn, mb_id, version_id, defn)
+                            mb_defn_cache[mb_id] = version_id
+                        version_id = mb_defn_cache[mb_id] or mb.get("versionId") or ""
                     store_youth_mb_requirements(conn, uid, mb_id, version_id, youth_reqs)
                 except ScoutingAPIError:
                     pass
 
-        # Leadership history
-        try:
-            lead_data = api.get_leadership_history(uid)
-            store_leadership(conn, uid, lead_data)
-        except ScoutingAPIError:
-            pass
+            # Leadership history
+            try:
+                store_leadership(conn, uid, fetched.parts["leadership"].result())
+            except ScoutingAPIError:
+                pass
 
-        # Birthdate (from person profile)
-        try:
-            profile = api.get_person_profile(uid)
-            birthdate = (
-                profile.get("dateOfBirth")
-                or profile.get("birthDate")
-                or profile.get("dob")
-                or (profile.get("profile") or {}).get("dateOfBirth")
-            )
-            if birthdate:
-                upsert_scout(conn, uid, birthdate=birthdate)
-        except ScoutingAPIError:
-            pass
+            # Birthdate (from person profile, unless already stored)
+            if "profile" in fetched.parts:
+                try:
+                    profile = fetched.parts["profile"].result()
+                    birthdate = (
+                        profile.get("dateOfBirth")
+                        or profile.get("birthDate")
+                        or profile.get("dob")
+                        or (profile.get("profile") or {}).get("dateOfBirth")
+                    )
+                    if birthdate:
+                        upsert_scout(conn, uid, birthdate=birthdate)
+                except ScoutingAPIError:
+                    pass
 
+            end_scout_writes(conn)
+            if i % SYNC_COMMIT_INTERVAL == 0:
+                conn.commit()
+            if i % LOG_BATCH_SIZE == 0:
+                _flush_logs()
+    except BaseException:
+        # Whatever stopped the sync (a 401, a network error), keep every
+        # Scout already synced.
+        _flush_logs()
+        commit_completed_scouts(conn)
+        raise
+    _flush_logs()
+
+    conn.commit()
+    analyze(conn)
+    api.close()
     conn.close()
     step(f"✓ Synced {total} Scout{'s' if total != 1 else ''} successfully")
     complete(args.db_path)
@@ -1,36 +1,56 @@
 """Troop-wide analytical queries."""
 
 
+def _troop_size(conn):
+    """Named parameters for the troop-percentage queries: the Scout count
+    and a divisor that is never zero."""
+    total = conn.execute("SELECT COUNT(*) FROM scouts").fetchone()[0]
+    return {"total_scouts": total, "divisor": max(total, 1)}
+
+
+# Per active merit badge, how many Scouts haven't completed it. Shared by
+# the needs-mb and plan reports, which differ only in how they filter and
+# order it.
+_MB_NEED_SQL = """
+    SELECT
+        mb.name,
+        mb.is_eagle_required,
+        COUNT(s.user_id) AS scouts_needing,
+        :total_scouts AS total_scouts,
+        ROUND(COUNT(s.user_id) * 100.0 / :divisor, 1) AS pct_needing
+    FROM merit_badges mb
+    CROSS JOIN scouts s
+    LEFT JOIN scout_merit_badges smb
+        ON smb.scout_user_id = s.user_id
+        AND smb.merit_badge_name = mb.name
+        AND smb.status = 'completed'
+    WHERE smb.id IS NULL
+      AND mb.active = 1
+      AND (:eagle_only = 0 OR mb.is_eagle_required = 1)
+    GROUP BY mb.name
+"""
+
+
 def most_common_incomplete_merit_badges(conn, limit=20, eagle_only=False):
     """Merit badges NOT completed by the most scouts.
 
     Shows which MBs would benefit the most scouts if offered as a
     troop activity.
     """
-    eagle_filter = "AND mb.is_eagle_required = 1" if eagle_only else ""
     return conn.execute(
         f"""
+        WITH need AS ({_MB_NEED_SQL})
         SELECT
-            mb.name AS merit_badge,
-            mb.is_eagle_required,
-            COUNT(s.user_id) AS scouts_needing,
-            (SELECT COUNT(*) FROM scouts) AS total_scouts,
-            ROUND(COUNT(s.user_id) * 100.0
-                  / MAX((SELECT COUNT(*) FROM scouts), 1), 1) AS pct_needing
-        FROM merit_badges mb
-        CROSS JOIN scouts s
-        LEFT JOIN scout_merit_badges smb
-            ON smb.scout_user_id = s.user_id
-            AND smb.merit_badge_name = mb.name
-            AND smb.status = 'completed'
-        WHERE smb.id IS NULL
-          AND mb.active = 1
-          {eagle_filter}
-        GROUP BY mb.name
-        ORDER BY scouts_needing DESC, mb.is_eagle_required DESC
-        LIMIT ?
+            name AS merit_badge,
+            is_eagle_required,
+            scouts_needing,
+            total_scouts,
+            pct_needing
+        FROM need
+        ORDER BY scouts_needing DESC, is_eagle_required DESC
+        LIMIT :limit
         """,
-        (limit,),
+        {**_troop_size(conn), "eagle_only": int(eagle_only), "limit": limit},
     ).fetchall()
 
 
@@ -100,28 +120,30 @@ def requirement_completion_matrix(conn, rank_id):
         SELECT
             r.requirement_number,
             COALESCE(r.short, SUBSTR(r.name, 1, 60)) AS requirement_desc,
-            (SELECT COUNT(*) FROM scouts) AS total_scouts,
+            rk.name AS rank_name,
+            :total_scouts AS total_scouts,
             COALESCE(SUM(CASE WHEN src.completed = 1 THEN 1 ELSE 0 END), 0)
                 AS scouts_completed,
-            (SELECT COUNT(*) FROM scouts)
+            :total_scouts
                 - COALESCE(SUM(CASE WHEN src.completed = 1 THEN 1 ELSE 0 END), 0)
                 AS scouts_needing,
             ROUND(
-                ((SELECT COUNT(*) FROM scouts)
+                (:total_scouts
                  - COALESCE(SUM(CASE WHEN src.completed = 1 THEN 1 ELSE 0 END), 0))
-                * 100.0 / MAX((SELECT COUNT(*) FROM scouts), 1), 1
+                * 100.0 / :divisor, 1
             ) AS pct_incomplete
         FROM requirements r
+        LEFT JOIN ranks rk ON rk.id = r.rank_id
         LEFT JOIN scout_requirement_completions src
             ON src.requirement_id = r.id
             AND src.completed = 1
-        WHERE r.rank_id = ?
+        WHERE r.rank_id = :rank_id
           AND r.required = 1
           AND r.parent_requirement_id IS NULL
         GROUP BY r.id
         ORDER BY pct_incomplete DESC
         """,
-        (rank_id,),
+        {**_troop_size(conn), "rank_id": rank_id},
     ).fetchall()
 
 
@@ -182,13 +204,8 @@ def mb_requirement_detail(conn, merit_badge_name=None):
             ON smrc.mb_requirement_id = mr.id
         INNER JOIN scout_merit_badges smb
             ON smb.scout_user_id = smrc.scout_user_id
+            AND smb.mb_api_id = smrc.mb_api_id
             AND smb.status = 'in_progress'
-            AND smrc.mb_api_id IN (
-                SELECT smb2.mb_api_id
-                FROM scout_merit_badges smb2
-                WHERE smb2.scout_user_id = smb.scout_user_id
-                  AND smb2.merit_badge_name = smb.merit_badge_name
-            )
         WHERE mr.parent_requirement_id IS NULL
           {name_filter}
         GROUP BY smb.merit_badge_name, mr.id
@@ -205,25 +222,17 @@ def optimal_group_activities(conn, min_pct=50.0):
     merit badges does the largest fraction of the troop still need?
     """
     return conn.execute(
-        """
+        f"""
+        WITH need AS ({_MB_NEED_SQL})
         SELECT
-            mb.name AS activity_name,
-            mb.is_eagle_required,
-            COUNT(s.user_id) AS scouts_benefiting,
-            (SELECT COUNT(*) FROM scouts) AS total_scouts,
-            ROUND(COUNT(s.user_id) * 100.0
-                  / MAX((SELECT COUNT(*) FROM scouts), 1), 1) AS pct_benefiting
-        FROM merit_badges mb
-        CROSS JOIN scouts s
-        LEFT JOIN scout_merit_badges smb
-            ON smb.scout_user_id = s.user_id
-            AND smb.merit_badge_name = mb.name
-            AND smb.status = 'completed'
-        WHERE smb.id IS NULL
-          AND mb.active = 1
-        GROUP BY mb.name
-        HAVING pct_benefiting >= ?
-        ORDER BY mb.is_eagle_required DESC, pct_benefiting DESC
+            name AS activity_name,
+            is_eagle_required,
+            scouts_needing AS scouts_benefiting,
+            total_scouts,
+            pct_needing AS pct_benefiting
+        FROM need
+        WHERE pct_needing >= :min_pct
+        ORDER BY is_eagle_required DESC, pct_benefiting DESC
         """,
-        (min_pct,),
+        {**_troop_size(conn), "eagle_only": 0, "min_pct": min_pct},
     ).fetchall()
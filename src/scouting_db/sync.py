@@ -0,0 +1,186 @@
+"""Concurrent fetching of per-Scout advancement data.
+
+A sync spends nearly all of its time waiting on api.scouting.org, so Scouts
+are fetched on a thread pool while the caller's thread consumes the results
+in roster order and does every database write on its one connection.
+
+Each fetched value is a completed Future: ``.result()`` returns the parsed
+JSON or raises the ScoutingAPIError the request hit, so callers handle
+errors exactly as if they had made the call themselves.
+"""
+
+import concurrent.futures
+import threading
+
+SCOUTS_BSA_PROGRAM_ID = 2
+DEFAULT_JOBS = 4
+# A sync commits after this many Scouts (and once at the end).
+SYNC_COMMIT_INTERVAL = 50
+# The fetch_youth_bundle parts a sync stores (awards are not kept).
+SYNC_BUNDLE_PARTS = ("ranks", "merit_badges", "leadership", "profile")
+# The same without the profile, for Scouts whose birthdate is already stored.
+SYNC_BUNDLE_PARTS_NO_PROFILE = tuple(p for p in SYNC_BUNDLE_PARTS if p != "profile")
+
+
+def _resolved(fn, *args):
+    """Run fn(*args) now and return its outcome as a completed Future."""
+    fut = concurrent.futures.Future()
+    try:
+        fut.set_result(fn(*args))
+    except Exception as exc:
+        fut.set_exception(exc)
+    return fut
+
+
+def in_progress_rank_ids(ranks_data):
+    """Ids of the Scouts BSA ranks in a youth ranks response not yet earned.
+
+    Each id appears once even if the response repeats a rank.
+    """
+    rank_ids, seen = [], set()
+    for prog in (ranks_data or {}).get("program") or []:
+        if prog.get("programId") != SCOUTS_BSA_PROGRAM_ID:
+            continue
+        for rank in prog.get("ranks") or []:
+            if rank.get("dateEarned") or rank.get("dateCompleted"):
+                continue
+            rank_id = rank.get("id")
+            if rank_id and int(rank_id) not in seen:
+                seen.add(int(rank_id))
+                rank_ids.append(int(rank_id))
+    return rank_ids
+
+
+def in_progress_merit_badges(mb_data):
+    """Merit badge entries in a youth meritBadges response not yet completed.
+
+    Only the first entry for each merit badge id is kept, so a duplicated
+    badge isn't fetched twice.
+    """
+    entries, seen = [], set()
+    for mb in mb_data if isinstance(mb_data, list) else []:
+        mb_id = mb.get("id")
+        if not mb_id or mb_id in seen or mb.get("dateCompleted") or mb.get("dateEarned"):
+            continue
+        seen.add(mb_id)
+        entries.append(mb)
+    return entries
+
+
+class DefinitionCache:
+    """Requirement definitions fetched at most once across worker threads.
+
+    Definitions are shared by every Scout working on the same rank or merit
+    badge. A failed fetch isn't remembered, so the next Scout retries it.
+
+    *stored* is a (rank_ids, mb_versions) pair as returned by
+    db.stored_definitions(); those definitions are already on disk, so they
+    aren't fetched and rank()/merit_badge() return None for them.
+    """
+
+    def __init__(self, api, stored=None):
+        self._api = api
+        self._lock = threading.Lock()
+        self._futures = {}
+        rank_ids, mb_versions = stored or (set(), {})
+        self._stored_ranks = frozenset(rank_ids)
+        self._stored_mbs = {k: frozenset(v) for k, v in mb_versions.items()}
+
+    def _get(self, key, fetch, *args):
+        with self._lock:
+            fut = self._futures.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._futures[key] = concurrent.futures.Future()
+        if owner:
+            try:
+                fut.set_result(fetch(*args))
+            except Exception as exc:
+                with self._lock:
+                    del self._futures[key]
+                fut.set_exception(exc)
+        return fut.result()
+
+    def rank(self, rank_id):
+        if rank_id in self._stored_ranks:
+            return None
+        return self._get(("rank", rank_id), self._api.get_rank_requirements, rank_id)
+
+    def merit_badge(self, mb_id, version_id=None):
+        """*version_id* is the Scout's badge version; a stored definition is
+        only reused if it matches (or the Scout's entry has no version)."""
+        versions = self._stored_mbs.get(mb_id)
+        if versions and (not version_id or str(version_id) in versions):
+            return None
+        return self._get(("mb", mb_id), self._api.get_mb_requirements, mb_id)
+
+
+class ScoutFetch:
+    """Everything fetched for one Scout, as completed Futures."""
+
+    def __init__(self, user_id, parts):
+        self.user_id = user_id
+        self.parts = parts   # part name -> Future of the JSON (no "profile" if skipped)
+        # The definition is None when DefinitionCache already has it on disk.
+        self.rank_reqs = []  # (rank_id, Future of (definition, youth_reqs))
+        self.mb_reqs = []    # (mb entry, Future of (definition, youth_reqs))
+
+
+def fetch_scout(api, user_id, defs, skip_reqs=False, skip_profile=False):
+    """Fetch one Scout's records, plus requirement detail for in-progress
+    ranks and merit badges unless *skip_reqs*. The person profile is left
+    out when *skip_profile*. Returns a ScoutFetch once every request has
+    finished."""
+    parts = SYNC_BUNDLE_PARTS_NO_PROFILE if skip_profile else SYNC_BUNDLE_PARTS
+    fetched = ScoutFetch(user_id, api.fetch_youth_bundle(user_id, parts=parts))
+    if skip_reqs:
+        concurrent.futures.wait(fetched.parts.values())
+        return fetched
+
+    ranks = fetched.parts["ranks"]
+    if ranks.exception() is None:
+        for rank_id in in_progress_rank_ids(ranks.result()):
+            fetched.rank_reqs.append((rank_id, _resolved(
+                lambda r: (defs.rank(r), api.get_youth_rank_requirements(user_id, r)),
+                rank_id,
+            )))
+
+    mbs = fetched.parts["merit_badges"]
+    if mbs.exception() is None:
+        for mb in in_progress_merit_badges(mbs.result()):
+            fetched.mb_reqs.append((mb, _resolved(
+                lambda m, v: (defs.merit_badge(m, v), api.get_youth_mb_requirements(user_id, m)),
+                mb["id"], mb.get("versionId"),
+            )))
+    concurrent.futures.wait(fetched.parts.values())
+    return fetched
+
+
+def fetch_scouts(api, user_ids, skip_reqs=False, jobs=DEFAULT_JOBS, stored_defs=None,
+                 skip_profile=(), before_wait=None):
+    """Yield a ScoutFetch for each user id, in order.
+
+    Up to *jobs* Scouts are fetched concurrently. Fetches still queued when
+    the consumer stops early (e.g. exits on a 401) are cancelled.
+    *stored_defs* is passed to DefinitionCache. Scouts whose user id is in
+    *skip_profile* (e.g. their birthdate is already stored) get no profile
+    request. *before_wait* is called before blocking on a Scout that is
+    still being fetched; a sync passes conn.commit, so the database write
+    lock isn't held while waiting on the network.
+    """
+    defs = DefinitionCache(api, stored_defs)
+    skip_profile = frozenset(skip_profile)
+    pool = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, jobs), thread_name_prefix="scout-sync"
+    )
+    try:
+        futures = [
+            pool.submit(fetch_scout, api, uid, defs, skip_reqs, uid in skip_profile)
+            for uid in user_ids
+        ]
+        for fut in futures:
+            if before_wait is not None and not fut.done():
+                before_wait()
+            yield fut.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
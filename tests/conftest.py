@@ -4,14 +4,32 @@ import sqlite3
 
 import pytest
 
-from scouting_db.db import init_db
+from scouting_db.db import init_db, upsert_scout
+
+
+@pytest.fixture(scope="session")
+def _schema_template():
+    """One in-memory DB with init_db applied, copied by each conn fixture."""
+    template = sqlite3.connect(":memory:")
+    init_db(template)
+    yield template
+    template.close()
 
 
 @pytest.fixture
-def conn():
+def conn(_schema_template):
     """In-memory SQLite DB with full schema initialized and Eagle MBs seeded."""
     c = sqlite3.connect(":memory:")
+    # Copying the template's pages is much cheaper than re-running the DDL.
+    _schema_template.backup(c)
     c.execute("PRAGMA foreign_keys=ON")
     c.row_factory = sqlite3.Row
-    init_db(c)
-    return c
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def default_scout(conn):
+    """Scout U1 (Alice), committed, for tests that need a one-Scout troop."""
+    upsert_scout(conn, "U1", "Alice", "Scout")
+    conn.commit()
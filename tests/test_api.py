@@ -1,13 +1,22 @@
 """Tests for scouting_db.api."""
 
+import gzip
 import io
 import json
+import sqlite3
+import time
 import urllib.error
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from scouting_db.api import ScoutingAPI, ScoutingAPIError, authenticate
+from scouting_db.api import (
+    MAX_IDLE_CONNECTIONS,
+    MAX_RETRIES,
+    ScoutingAPI,
+    ScoutingAPIError,
+    authenticate,
+)
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -35,6 +44,36 @@ def _patch_urlopen(data: dict):
     )
 
 
+def _mock_connection(
+    data=None, status: int = 200, body: str | None = None, headers: dict | None = None
+) -> MagicMock:
+    """Create a MagicMock that acts as a keep-alive http.client connection."""
+    conn = MagicMock()
+    resp = conn.getresponse.return_value
+    resp.status = status
+    resp.will_close = False
+    resp.getheader.side_effect = (headers or {}).get
+    payload = body if body is not None else json.dumps(data)
+    resp.read.return_value = payload.encode("utf-8")
+    return conn
+
+
+def _patch_connection(
+    data=None, status: int = 200, body: str | None = None, headers: dict | None = None
+):
+    return patch(
+        "scouting_db.api.http.client.HTTPSConnection",
+        return_value=_mock_connection(data, status, body, headers),
+    )
+
+
+def _sent(mock_cls) -> tuple:
+    """Return (method, url, body, headers) of the last request sent."""
+    call = mock_cls.return_value.request.call_args
+    method, url = call[0]
+    return method, url, call[1]["body"], call[1]["headers"]
+
+
 # ── ScoutingAPIError ──────────────────────────────────────────────────────────
 
 
@@ -132,67 +171,282 @@ class TestScoutingAPIRequest:
 
     def test_get_returns_parsed_json(self):
         data = {"ranks": [{"id": 1, "name": "Scout"}]}
-        with _patch_urlopen(data):
+        with _patch_connection(data):
             result = self.api._request("/advancements/ranks")
         assert result == data
 
     def test_get_with_params_builds_query_string(self):
-        with _patch_urlopen({}) as mock_open:
+        with _patch_connection({}) as mock_cls:
             self.api._request("/path", params={"foo": "bar", "baz": 42})
-        url = mock_open.call_args[0][0].full_url
+        _, url, _, _ = _sent(mock_cls)
         assert "foo=bar" in url
         assert "baz=42" in url
 
-    def test_base_url_prepended(self):
-        with _patch_urlopen({}) as mock_open:
+    def test_connects_to_api_host(self):
+        with _patch_connection({}) as mock_cls:
             self.api._request("/my/path")
-        url = mock_open.call_args[0][0].full_url
-        assert url.startswith("https://api.scouting.org/my/path")
+        assert mock_cls.call_args[0][0] == "api.scouting.org"
+        _, url, _, _ = _sent(mock_cls)
+        assert url.startswith("/my/path")
 
     def test_auth_token_added_as_bearer(self):
-        with _patch_urlopen({}) as mock_open:
+        with _patch_connection({}) as mock_cls:
             self.api._request("/path")
-        req = mock_open.call_args[0][0]
-        assert req.get_header("Authorization") == "Bearer test-token"
+        _, _, _, headers = _sent(mock_cls)
+        assert headers["Authorization"] == "Bearer test-token"
 
     def test_no_auth_header_when_no_token(self):
         api = ScoutingAPI(token=None)
-        with _patch_urlopen({}) as mock_open:
+        with _patch_connection({}) as mock_cls:
             api._request("/path")
-        req = mock_open.call_args[0][0]
-        assert req.get_header("Authorization") is None
+        _, _, _, headers = _sent(mock_cls)
+        assert "Authorization" not in headers
+
+    def test_token_change_updates_auth_header(self):
+        api = ScoutingAPI(token=None)
+        api.token = "new-token"
+        with _patch_connection({}) as mock_cls:
+            api._request("/path")
+        _, _, _, headers = _sent(mock_cls)
+        assert headers["Authorization"] == "Bearer new-token"
+
+    def test_get_has_no_content_type(self):
+        with _patch_connection({}) as mock_cls:
+            self.api._request("/path")
+        _, _, _, headers = _sent(mock_cls)
+        assert "Content-Type" not in headers
 
     def test_http_error_raises_scoutingerror(self):
-        with patch(
-            "scouting_db.api.urllib.request.urlopen",
-            side_effect=_http_error(500, "Server Error"),
-        ):
+        with _patch_connection(status=500, body="Server Error"):
             with pytest.raises(ScoutingAPIError) as exc_info:
                 self.api._request("/path")
         assert exc_info.value.status_code == 500
+        assert exc_info.value.message == "Server Error"
 
     def test_post_with_body_sends_json(self):
-        with _patch_urlopen({}) as mock_open:
+        with _patch_connection({}) as mock_cls:
             self.api._request("/path", method="POST", body={"key": "value"})
-        req = mock_open.call_args[0][0]
-        assert req.get_header("Content-type") == "application/json"
-        assert json.loads(req.data) == {"key": "value"}
+        _, _, body, headers = _sent(mock_cls)
+        assert headers["Content-Type"] == "application/json"
+        assert body == b'{"key":"value"}'
 
     def test_get_default_method(self):
-        with _patch_urlopen({}) as mock_open:
+        with _patch_connection({}) as mock_cls:
             self.api._request("/path")
-        req = mock_open.call_args[0][0]
-        assert req.get_method() == "GET"
+        method, _, _, _ = _sent(mock_cls)
+        assert method == "GET"
 
     def test_401_error_preserves_status_code(self):
-        with patch(
-            "scouting_db.api.urllib.request.urlopen",
-            side_effect=_http_error(401, "Unauthorized"),
-        ):
+        with _patch_connection(status=401, body="Unauthorized"):
             with pytest.raises(ScoutingAPIError) as exc_info:
                 self.api._request("/path")
         assert exc_info.value.status_code == 401
 
+    def test_requests_gzip_encoding(self):
+        with _patch_connection({}) as mock_cls:
+            self.api._request("/path")
+        _, _, _, headers = _sent(mock_cls)
+        assert headers["Accept-Encoding"] == "gzip"
+
+    def test_gzip_response_decompressed(self):
+        data = {"ranks": [{"id": 1}]}
+        conn = _mock_connection(headers={"Content-Encoding": "gzip"})
+        conn.getresponse.return_value.read.return_value = gzip.compress(
+            json.dumps(data).encode("utf-8")
+        )
+        with patch("scouting_db.api.http.client.HTTPSConnection", return_value=conn):
+            assert self.api._request("/path") == data
+
+    def test_connection_reused_across_requests(self):
+        with _patch_connection({}) as mock_cls:
+            self.api._request("/a")
+            self.api._request("/b")
+        assert mock_cls.call_count == 1
+        assert mock_cls.return_value.request.call_count == 2
+
+    def test_connection_dropped_when_server_closes(self):
+        with _patch_connection({}) as mock_cls:
+            mock_cls.return_value.getresponse.return_value.will_close = True
+            self.api._request("/a")
+            self.api._request("/b")
+        assert mock_cls.call_count == 2
+
+    def test_stale_pooled_connection_retried_on_fresh_one(self):
+        stale = MagicMock()
+        stale.request.side_effect = ConnectionResetError()
+        self.api._idle.append(stale)
+        with _patch_connection({"ok": True}) as mock_cls:
+            result = self.api._request("/path")
+        assert result == {"ok": True}
+        stale.close.assert_called_once()
+        assert mock_cls.call_count == 1
+
+    def test_idle_pool_is_capped(self):
+        conns = [MagicMock() for _ in range(MAX_IDLE_CONNECTIONS + 2)]
+        for c in conns:
+            self.api._release(c)
+        assert len(self.api._idle) == MAX_IDLE_CONNECTIONS
+        conns[-1].close.assert_called_once()
+
+    def test_close_closes_idle_connections(self):
+        with _patch_connection({}) as mock_cls:
+            with ScoutingAPI(token="tok") as api:
+                api._request("/path")
+        mock_cls.return_value.close.assert_called_once()
+        assert api._idle == []
+
+    def test_fresh_connection_failure_propagates(self):
+        with _patch_connection({}) as mock_cls:
+            mock_cls.return_value.request.side_effect = ConnectionRefusedError()
+            with pytest.raises(ConnectionRefusedError):
+                self.api._request("/path")
+        assert mock_cls.call_count == 1
+
+
+# ── ScoutingAPI retries ───────────────────────────────────────────────────────
+
+
+def _patch_responses(*statuses, headers=None):
+    """Patch HTTPSConnection to answer successive requests with *statuses*."""
+    conn = MagicMock()
+    responses = []
+    for status in statuses:
+        resp = MagicMock()
+        resp.status = status
+        resp.will_close = False
+        resp.getheader.side_effect = (headers or {}).get
+        resp.read.return_value = json.dumps({"status": status}).encode("utf-8")
+        responses.append(resp)
+    conn.getresponse.side_effect = responses
+    return patch("scouting_db.api.http.client.HTTPSConnection", return_value=conn)
+
+
+class TestScoutingAPIRetry:
+    def setup_method(self):
+        self.api = ScoutingAPI(token="t")
+
+    def test_transient_status_retried_with_backoff(self):
+        with _patch_responses(503, 502, 200), patch("scouting_db.api.time.sleep") as sleep:
+            assert self.api._request("/path") == {"status": 200}
+        assert [c.args[0] for c in sleep.call_args_list] == [0.3, 0.6]
+
+    def test_gives_up_after_max_retries(self):
+        with _patch_responses(*[429] * (MAX_RETRIES + 1)), patch("scouting_db.api.time.sleep"):
+            with pytest.raises(ScoutingAPIError) as exc_info:
+                self.api._request("/path")
+        assert exc_info.value.status_code == 429
+
+    def test_retry_after_header_honored(self):
+        with _patch_responses(429, 200, headers={"Retry-After": "2"}), \
+                patch("scouting_db.api.time.sleep") as sleep:
+            self.api._request("/path")
+        sleep.assert_called_once_with(2)
+
+    def test_post_not_retried(self):
+        with _patch_responses(503, 200), patch("scouting_db.api.time.sleep") as sleep:
+            with pytest.raises(ScoutingAPIError):
+                self.api._request("/path", method="POST", body={})
+        sleep.assert_not_called()
+
+    def test_other_errors_not_retried(self):
+        with _patch_responses(500, 200), patch("scouting_db.api.time.sleep") as sleep:
+            with pytest.raises(ScoutingAPIError):
+                self.api._request("/path")
+        sleep.assert_not_called()
+
+
+# ── ScoutingAPI conditional-GET cache ─────────────────────────────────────────
+
+
+class TestScoutingAPICache:
+    # Each phase uses a new client so it doesn't pick up the previous
+    # phase's mock connection from the keep-alive pool.
+
+    def setup_method(self):
+        self.data = {"requirements": [{"id": 1}]}
+
+    def test_validators_sent_and_304_served_from_cache(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        with _patch_connection(
+            self.data, headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024"}
+        ):
+            assert ScoutingAPI(cache_path=path).get_rank_requirements(7) == self.data
+        with _patch_connection(status=304, body="") as mock_cls:
+            assert ScoutingAPI(cache_path=path).get_rank_requirements(7) == self.data
+        _, _, _, headers = _sent(mock_cls)
+        assert headers["If-None-Match"] == '"v1"'
+        assert headers["If-Modified-Since"] == "Mon, 01 Jan 2024"
+
+    def test_refreshed_body_replaces_cached_one(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        with _patch_connection(self.data, headers={"ETag": '"v1"'}):
+            ScoutingAPI(cache_path=path).get_mb_requirements(55)
+        with _patch_connection({"requirements": []}, headers={"ETag": '"v2"'}):
+            ScoutingAPI(cache_path=path).get_mb_requirements(55)
+        with _patch_connection(status=304, body="") as mock_cls:
+            result = ScoutingAPI(cache_path=path).get_mb_requirements(55)
+        assert result == {"requirements": []}
+        assert _sent(mock_cls)[3]["If-None-Match"] == '"v2"'
+
+    def test_response_without_validators_not_cached(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        with _patch_connection(self.data):
+            ScoutingAPI(cache_path=path).get_ranks()
+        with _patch_connection(self.data) as mock_cls:
+            ScoutingAPI(cache_path=path).get_ranks()
+        assert "If-None-Match" not in _sent(mock_cls)[3]
+
+    def test_per_scout_endpoints_not_cached(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        with _patch_connection(self.data, headers={"ETag": '"v1"'}):
+            ScoutingAPI(token="tok", cache_path=path).get_youth_ranks("U99")
+        with _patch_connection(self.data) as mock_cls:
+            ScoutingAPI(token="tok", cache_path=path).get_youth_ranks("U99")
+        assert "If-None-Match" not in _sent(mock_cls)[3]
+
+
+class TestScoutingAPICacheMaxAge:
+    def setup_method(self):
+        self.data = {"requirements": [{"id": 1}]}
+
+    def test_fresh_entry_served_without_request(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        with _patch_connection(self.data, headers={"Cache-Control": "max-age=3600"}):
+            ScoutingAPI(cache_path=path).get_rank_requirements(7)
+        with _patch_connection({}) as mock_cls:
+            assert ScoutingAPI(cache_path=path).get_rank_requirements(7) == self.data
+        mock_cls.return_value.request.assert_not_called()
+
+    def test_expired_entry_revalidated(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        with _patch_connection(
+            self.data, headers={"ETag": '"v1"', "Cache-Control": "max-age=60"}
+        ):
+            ScoutingAPI(cache_path=path).get_rank_requirements(7)
+        with patch("scouting_db.api.time.time", return_value=time.time() + 120):
+            with _patch_connection(status=304, body="") as mock_cls:
+                assert ScoutingAPI(cache_path=path).get_rank_requirements(7) == self.data
+        assert _sent(mock_cls)[3]["If-None-Match"] == '"v1"'
+
+    def test_no_store_not_cached(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        with _patch_connection(
+            self.data, headers={"ETag": '"v1"', "Cache-Control": "no-store"}
+        ):
+            ScoutingAPI(cache_path=path).get_rank_requirements(7)
+        with _patch_connection(self.data) as mock_cls:
+            ScoutingAPI(cache_path=path).get_rank_requirements(7)
+        assert "If-None-Match" not in _sent(mock_cls)[3]
+
+    def test_outdated_cache_layout_rebuilt(self, tmp_path):
+        path = str(tmp_path / "http-cache.db")
+        old = sqlite3.connect(path)
+        old.execute("CREATE TABLE http_cache (url TEXT PRIMARY KEY, body BLOB)")
+        old.commit()
+        old.close()
+        with _patch_connection(self.data, headers={"ETag": '"v1"'}):
+            assert ScoutingAPI(cache_path=path).get_ranks() == self.data
+
 
 # ── ScoutingAPI endpoint URL construction ─────────────────────────────────────
 
@@ -202,9 +456,9 @@ class TestScoutingAPIEndpoints:
         self.api = ScoutingAPI(token="tok")
 
     def _get_url(self, fn, *args, **kwargs):
-        with _patch_urlopen({}) as m:
+        with _patch_connection({}) as m:
             fn(*args, **kwargs)
-        return m.call_args[0][0].full_url
+        return _sent(m)[1]
 
     def test_get_ranks_default_params(self):
         url = self._get_url(self.api.get_ranks)
@@ -261,10 +515,40 @@ class TestScoutingAPIEndpoints:
         assert "/advancements/v2/youth/U99/ranks" in url
 
     def test_validate_token_raises_on_401(self):
-        with patch(
-            "scouting_db.api.urllib.request.urlopen",
-            side_effect=_http_error(401, "Unauthorized"),
-        ):
+        with _patch_connection(status=401, body="Unauthorized"):
             with pytest.raises(ScoutingAPIError) as exc_info:
                 self.api.validate_token("U99")
         assert exc_info.value.status_code == 401
+
+
+# ── ScoutingAPI.fetch_youth_bundle ────────────────────────────────────────────
+
+
+class TestFetchYouthBundle:
+    def setup_method(self):
+        self.api = ScoutingAPI(token="tok")
+
+    def test_returns_future_per_part(self):
+        with patch.object(ScoutingAPI, "_request", side_effect=lambda path: path):
+            bundle = self.api.fetch_youth_bundle("U99", parts=("ranks", "profile"))
+            results = {k: f.result() for k, f in bundle.items()}
+        assert results == {
+            "ranks": "/advancements/v2/youth/U99/ranks",
+            "profile": "/persons/v2/U99/personprofile",
+        }
+
+    def test_default_parts_cover_all_getters(self):
+        with patch.object(ScoutingAPI, "_request", return_value={}):
+            bundle = self.api.fetch_youth_bundle("U99")
+            for f in bundle.values():
+                f.result()
+        assert set(bundle) == {"ranks", "merit_badges", "awards", "leadership", "profile"}
+
+    def test_error_raised_from_result(self):
+        with patch.object(
+            ScoutingAPI, "_request", side_effect=ScoutingAPIError(403, "Forbidden")
+        ):
+            bundle = self.api.fetch_youth_bundle("U99", parts=("awards",))
+            with pytest.raises(ScoutingAPIError) as exc_info:
+                bundle["awards"].result()
+        assert exc_info.value.status_code == 403
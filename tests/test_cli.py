@@ -0,0 +1,73 @@
+"""Tests for scouting_db.cli."""
+
+import argparse
+from unittest.mock import patch
+
+import pytest
+
+from scouting_db import cli
+from scouting_db.api import ScoutingAPI, ScoutingAPIError
+from scouting_db.db import get_connection, init_db, upsert_scout
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+
+RANKS = {"program": [{"programId": 2, "ranks": [{"id": 1, "name": "Scout"}]}]}
+
+
+def _roster_db(tmp_path, count):
+    """A database file with Scouts U0..U<count-1>."""
+    path = str(tmp_path / "troop.db")
+    conn = get_connection(path)
+    init_db(conn, "T")
+    for i in range(count):
+        upsert_scout(conn, f"U{i}", f"F{i}", "L")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _sync_scouts(db_path, fail_on):
+    """Run sync-scouts against a fake API that raises for the paths in
+    *fail_on* (path suffix -> exception)."""
+
+    def _request(self, path, params=None, **kwargs):
+        for suffix, exc in fail_on.items():
+            if path.endswith(suffix):
+                raise exc
+        if path.endswith("/ranks"):
+            return RANKS
+        return {}
+
+    with patch.object(ScoutingAPI, "_request", _request), \
+            patch.object(cli, "require_token", lambda: "tok"), \
+            patch.object(cli, "_ensure_troop_name", lambda conn: None), \
+            patch.object(cli, "_token_is_fresh", lambda: True):
+        cli.cmd_sync_scouts(argparse.Namespace(db=db_path, skip_reqs=True, jobs=2))
+
+
+def _synced_scouts(db_path):
+    conn = get_connection(db_path)
+    rows = conn.execute(
+        "SELECT DISTINCT scout_user_id FROM scout_advancements ORDER BY scout_user_id"
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+
+# ── sync-scouts ───────────────────────────────────────────────────────────────
+
+
+class TestSyncScoutsInterrupted:
+    def test_network_error_keeps_completed_scouts(self, tmp_path):
+        db_path = _roster_db(tmp_path, 5)
+        with pytest.raises(OSError):
+            _sync_scouts(db_path, {"U3/ranks": OSError("connection reset")})
+        assert _synced_scouts(db_path) == ["U0", "U1", "U2"]
+
+    def test_unauthorized_keeps_completed_scouts(self, tmp_path):
+        db_path = _roster_db(tmp_path, 5)
+        with pytest.raises(SystemExit):
+            _sync_scouts(db_path, {"U2/ranks": ScoutingAPIError(401, "expired")})
+        assert _synced_scouts(db_path) == ["U0", "U1"]
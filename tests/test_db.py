@@ -1,15 +1,27 @@
 """Tests for scouting_db.db."""
 
 import csv
+import io
 import sqlite3
 
 import pytest
 
 from scouting_db.db import (
+    BULK_LOAD_TABLES,
     EAGLE_REQUIRED_MERIT_BADGES,
+    SCHEMA_VERSION,
+    analyze,
+    begin_scout_writes,
+    commit_completed_scouts,
+    drop_indexes,
+    end_scout_writes,
     get_connection,
     import_roster_csv,
     init_db,
+    latest_mb_version,
+    mark_scout_synced,
+    ranks_needing_requirements,
+    restore_indexes,
     seed_eagle_merit_badges,
     set_setting,
     store_leadership,
@@ -17,6 +29,7 @@ from scouting_db.db import (
     store_youth_merit_badges,
     store_youth_rank_requirements,
     store_youth_ranks,
+    stored_definitions,
     upsert_mb_requirements,
     upsert_ranks,
     upsert_requirements,
@@ -35,16 +48,25 @@ def _insert_rank(conn, rank_id, name="Test Rank", level=0, program_id=2):
     conn.commit()
 
 
+def _fresh_db(troop_name=None):
+    """A new in-memory DB run through init_db itself, not the conn template."""
+    c = sqlite3.connect(":memory:")
+    c.row_factory = sqlite3.Row
+    init_db(c, troop_name=troop_name)
+    return c
+
+
 def _insert_scout(conn, user_id="U1", first="Alice", last="Scout"):
     upsert_scout(conn, user_id, first, last)
 
 
 def _write_csv(tmp_path, headers, rows, filename="roster.csv"):
     path = tmp_path / filename
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
+    buf = io.StringIO(newline="")
+    writer = csv.DictWriter(buf, fieldnames=headers)
+    writer.writeheader()
+    writer.writerows(rows)
+    path.write_bytes(buf.getvalue().encode("utf-8"))
     return path
 
 
@@ -68,6 +90,28 @@ class TestGetConnection:
         assert row[0] == 1
         conn.close()
 
+    def test_wal_with_normal_synchronous(self, tmp_path):
+        conn = get_connection(str(tmp_path / "test.db"))
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        conn.close()
+
+    def test_write_transactions_begin_immediate(self, tmp_path):
+        conn = get_connection(str(tmp_path / "test.db"))
+        assert conn.isolation_level == "IMMEDIATE"
+        conn.close()
+
+    def test_bulk_turns_off_synchronous(self, tmp_path):
+        conn = get_connection(str(tmp_path / "test.db"), bulk=True)
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0  # OFF
+        conn.close()
+
+    def test_page_cache_and_mmap_sizes(self, tmp_path):
+        conn = get_connection(str(tmp_path / "test.db"))
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 268435456
+        conn.close()
+
 
 # ── init_db ───────────────────────────────────────────────────────────────────
 
@@ -104,6 +148,8 @@ class TestInitDb:
         }
         assert "idx_scout_adv_type" in indexes
         assert "idx_scout_mb_status" in indexes
+        assert "idx_scout_req_requirement" in indexes
+        assert "idx_req_rank" in indexes
 
     def test_seeds_eagle_merit_badges(self, conn):
         count = conn.execute(
@@ -112,25 +158,106 @@ class TestInitDb:
         assert count == len(EAGLE_REQUIRED_MERIT_BADGES)
 
     def test_sets_troop_name_when_provided(self):
-        c = sqlite3.connect(":memory:")
-        c.row_factory = sqlite3.Row
-        init_db(c, troop_name="Troop 13")
+        c = _fresh_db(troop_name="Troop 13")
         row = c.execute("SELECT value FROM settings WHERE key='troop_name'").fetchone()
         assert row["value"] == "Troop 13"
 
     def test_no_troop_name_setting_when_omitted(self):
-        c = sqlite3.connect(":memory:")
-        c.row_factory = sqlite3.Row
-        init_db(c)
+        c = _fresh_db()
         row = c.execute("SELECT value FROM settings WHERE key='troop_name'").fetchone()
         assert row is None
 
+    def test_stamps_schema_version(self, conn):
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    def test_current_schema_skips_seed(self, conn):
+        conn.execute("DELETE FROM merit_badges")
+        conn.commit()
+        init_db(conn)
+        assert conn.execute("SELECT COUNT(*) FROM merit_badges").fetchone()[0] == 0
+
+    def test_adds_new_columns_to_older_database(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE scouts (user_id TEXT PRIMARY KEY, last_synced_at TEXT)")
+        # ranks as it was before schema version 4 (no defs_synced_at).
+        conn.execute(
+            "CREATE TABLE ranks (id INTEGER PRIMARY KEY, name TEXT NOT NULL,"
+            " level INTEGER NOT NULL, program_id INTEGER NOT NULL, program TEXT,"
+            " image_url TEXT, version TEXT, active INTEGER NOT NULL DEFAULT 1)"
+        )
+        conn.execute("INSERT INTO ranks (id, name, level, program_id) VALUES (1, 'Scout', 0, 2)")
+        conn.execute("PRAGMA user_version = 3")
+        init_db(conn)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(scouts)")}
+        assert "advancements_synced_at" in columns
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(ranks)")}
+        assert "defs_synced_at" in columns
+        # An upgraded rank has never had its definitions stored.
+        assert [tuple(r) for r in ranks_needing_requirements(conn, 2)] == [(1, "Scout")]
+        conn.close()
+
     def test_idempotent_no_duplicates(self, conn):
-        init_db(conn)  # run a second time
+        # Clear the version stamp so the full setup really runs a second time.
+        conn.execute("PRAGMA user_version = 0")
+        init_db(conn)
         count = conn.execute("SELECT COUNT(*) FROM merit_badges").fetchone()[0]
         assert count == len(EAGLE_REQUIRED_MERIT_BADGES)
 
 
+# ── drop_indexes / restore_indexes ────────────────────────────────────────────
+
+
+class TestBulkIndexes:
+    def _index_names(self, conn):
+        return {
+            r["name"] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND sql IS NOT NULL"
+            )
+        }
+
+    def test_drops_only_bulk_table_indexes(self, conn):
+        before = self._index_names(conn)
+        ddl = drop_indexes(conn)
+        after = self._index_names(conn)
+        assert ddl
+        assert "idx_mb_req_version" in after  # mb_requirements isn't a bulk table
+        assert not any(
+            r["tbl_name"] in BULK_LOAD_TABLES
+            for r in conn.execute(
+                "SELECT tbl_name FROM sqlite_master WHERE type='index' AND sql IS NOT NULL"
+            )
+        )
+        assert after < before
+
+    def test_unique_constraints_kept(self, conn):
+        _insert_scout(conn, "U1")
+        drop_indexes(conn)
+        store_youth_merit_badges(conn, "U1", [{"name": "Camping"}])
+        store_youth_merit_badges(conn, "U1", [{"name": "Camping"}])
+        count = conn.execute("SELECT COUNT(*) FROM scout_merit_badges").fetchone()[0]
+        assert count == 1
+
+    def test_restore_recreates_indexes(self, conn):
+        before = self._index_names(conn)
+        restore_indexes(conn, drop_indexes(conn))
+        assert self._index_names(conn) == before
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    def test_interrupted_load_repaired_by_init_db(self, conn):
+        before = self._index_names(conn)
+        drop_indexes(conn)
+        init_db(conn)
+        assert self._index_names(conn) == before
+
+    def test_analyze_writes_planner_stats(self, conn):
+        _insert_scout(conn, "U1")
+        store_youth_merit_badges(conn, "U1", [{"name": "Camping"}])
+        analyze(conn)
+        tables = {r[0] for r in conn.execute("SELECT tbl FROM sqlite_stat1")}
+        assert "scout_merit_badges" in tables
+        assert not conn.in_transaction
+
+
 # ── set_setting ───────────────────────────────────────────────────────────────
 
 
@@ -177,30 +304,31 @@ class TestSeedEagleMeritBadges:
         ).fetchone()[0]
         assert count == len(EAGLE_REQUIRED_MERIT_BADGES)
 
-    def test_correct_count(self, conn):
+    def test_correct_count(self):
         assert len(EAGLE_REQUIRED_MERIT_BADGES) == 18
 
 
 # ── upsert_ranks ──────────────────────────────────────────────────────────────
 
 
+_SCOUT_RANK = [{"id": 1, "name": "Scout", "level": 0, "programId": 2}]
+
+
 class TestUpsertRanks:
-    def test_from_list(self, conn):
-        count = upsert_ranks(conn, [{"id": 1, "name": "Scout", "level": 0, "programId": 2}])
+    @pytest.mark.parametrize(
+        "data",
+        [_SCOUT_RANK, {"value": _SCOUT_RANK}, {"ranks": _SCOUT_RANK}],
+        ids=["list", "value_key", "ranks_key"],
+    )
+    def test_response_shapes(self, conn, data):
+        count = upsert_ranks(conn, data)
         assert count == 1
         row = conn.execute("SELECT name FROM ranks WHERE id=1").fetchone()
         assert row["name"] == "Scout"
 
-    def test_from_dict_with_value_key(self, conn):
-        data = {"value": [{"id": 2, "name": "Tenderfoot", "level": 1, "programId": 2}]}
-        count = upsert_ranks(conn, data)
-        assert count == 1
-        assert conn.execute("SELECT id FROM ranks WHERE id=2").fetchone() is not None
-
-    def test_from_dict_with_ranks_key(self, conn):
-        data = {"ranks": [{"id": 3, "name": "Second Class", "level": 2, "programId": 2}]}
-        count = upsert_ranks(conn, data)
-        assert count == 1
+    def test_leaves_transaction_open_for_caller(self, conn):
+        upsert_ranks(conn, [{"id": 1, "name": "Scout"}])
+        assert conn.in_transaction
 
     def test_updates_existing_rank(self, conn):
         upsert_ranks(conn, [{"id": 1, "name": "Old", "level": 0, "programId": 2}])
@@ -208,15 +336,14 @@ class TestUpsertRanks:
         row = conn.execute("SELECT name FROM ranks WHERE id=1").fetchone()
         assert row["name"] == "New"
 
-    def test_active_string_true_stored_as_1(self, conn):
-        upsert_ranks(conn, [{"id": 1, "name": "R", "level": 0, "programId": 2, "active": "True"}])
-        row = conn.execute("SELECT active FROM ranks WHERE id=1").fetchone()
-        assert row["active"] == 1
-
-    def test_active_string_false_stored_as_0(self, conn):
-        upsert_ranks(conn, [{"id": 1, "name": "R", "level": 0, "programId": 2, "active": "False"}])
+    @pytest.mark.parametrize(
+        "active, expected",
+        [("True", 1), ("False", 0), (False, 0), (True, 1), ("TRUE", 1), (None, 0)],
+    )
+    def test_active_flag(self, conn, active, expected):
+        upsert_ranks(conn, [{"id": 1, "name": "R", "active": active}])
         row = conn.execute("SELECT active FROM ranks WHERE id=1").fetchone()
-        assert row["active"] == 0
+        assert row["active"] == expected
 
     def test_multiple_ranks_returns_count(self, conn):
         ranks = [{"id": i, "name": f"Rank{i}", "level": i, "programId": 2} for i in range(1, 6)]
@@ -285,15 +412,36 @@ class TestUpsertRequirements:
         count = upsert_requirements(conn, 10, reqs)
         assert count == 3
 
-    def test_from_dict_requirements_key(self, conn):
+    def test_tree_deeper_than_recursion_limit(self, conn):
+        _insert_rank(conn, 10)
+        leaf = {"id": 5000}
+        node = leaf
+        for req_id in range(4999, 999, -1):
+            node = {"id": req_id, "requirements": [node]}
+        assert upsert_requirements(conn, 10, [node]) == 4001
+        row = conn.execute("SELECT parent_requirement_id FROM requirements WHERE id=5000").fetchone()
+        assert row["parent_requirement_id"] == 4999
+
+    @pytest.mark.parametrize("key", ["requirements", "value"])
+    def test_from_dict(self, conn, key):
         _insert_rank(conn, 10)
-        count = upsert_requirements(conn, 10, {"requirements": [{"id": 200, "requirementNumber": "1", "name": "R"}]})
+        count = upsert_requirements(conn, 10, {key: [{"id": 200, "requirementNumber": "1", "name": "R"}]})
         assert count == 1
 
-    def test_from_dict_value_key(self, conn):
+    def test_ranks_needing_requirements(self, conn):
+        _insert_rank(conn, 10, level=1)
+        _insert_rank(conn, 11, level=2)
+        _insert_rank(conn, 12, level=3)
+        upsert_requirements(conn, 10, [{"id": 200}])
+        upsert_requirements(conn, 12, [])  # nothing stored, still needed
+        assert [r[0] for r in ranks_needing_requirements(conn, 2)] == [11, 12]
+        assert [r[0] for r in ranks_needing_requirements(conn, 2, None)] == [10, 11, 12]
+
+    def test_ranks_needing_requirements_after_max_age(self, conn):
         _insert_rank(conn, 10)
-        count = upsert_requirements(conn, 10, {"value": [{"id": 300, "requirementNumber": "1", "name": "R"}]})
-        assert count == 1
+        upsert_requirements(conn, 10, [{"id": 200}])
+        conn.execute("UPDATE ranks SET defs_synced_at = '2000-01-01T00:00:00+00:00'")
+        assert [r[0] for r in ranks_needing_requirements(conn, 2)] == [10]
 
     def test_skips_items_without_id(self, conn):
         _insert_rank(conn, 10)
@@ -348,37 +496,99 @@ class TestUpsertScout:
         row = conn.execute("SELECT scouting_member_id FROM scouts WHERE user_id='U1'").fetchone()
         assert row["scouting_member_id"] == "M12345"
 
+    def test_leaves_transaction_open_for_caller(self, conn):
+        upsert_scout(conn, "U1")
+        assert conn.in_transaction
+
+    def test_mark_scout_synced(self, conn):
+        upsert_scout(conn, "U1")
+        row = conn.execute("SELECT advancements_synced_at FROM scouts").fetchone()
+        assert row[0] is None  # importing a Scout isn't a sync
+        mark_scout_synced(conn, "U1")
+        row = conn.execute("SELECT advancements_synced_at FROM scouts").fetchone()
+        assert row[0] is not None
+
+
+# ── begin_scout_writes / end_scout_writes / commit_completed_scouts ───────────
+
+
+class TestScoutWrites:
+    def _user_ids(self, conn):
+        return [r[0] for r in conn.execute("SELECT user_id FROM scouts ORDER BY user_id")]
+
+    def test_end_leaves_batch_uncommitted(self, conn):
+        begin_scout_writes(conn)
+        _insert_scout(conn, "U1")
+        end_scout_writes(conn)
+        assert conn.in_transaction
+        conn.rollback()
+        assert self._user_ids(conn) == []
+
+    def test_stop_keeps_completed_scouts(self, conn):
+        for uid in ("U1", "U2"):
+            begin_scout_writes(conn)
+            _insert_scout(conn, uid)
+            end_scout_writes(conn)
+        begin_scout_writes(conn)
+        _insert_scout(conn, "U3")
+        commit_completed_scouts(conn)
+        assert not conn.in_transaction
+        assert self._user_ids(conn) == ["U1", "U2"]
+
+    def test_stop_before_first_scout(self, conn):
+        commit_completed_scouts(conn)
+        assert not conn.in_transaction
+
+    def test_stop_between_scouts(self, conn):
+        begin_scout_writes(conn)
+        _insert_scout(conn, "U1")
+        end_scout_writes(conn)
+        commit_completed_scouts(conn)
+        assert not conn.in_transaction
+        assert self._user_ids(conn) == ["U1"]
+
 
 # ── import_roster_csv ─────────────────────────────────────────────────────────
 
 
 class TestImportRosterCsv:
-    def test_standard_scoutbook_columns(self, conn, tmp_path):
-        path = _write_csv(
-            tmp_path,
-            ["User ID", "First Name", "Last Name", "Patrol"],
-            [
-                {"User ID": "U1", "First Name": "Alice", "Last Name": "Scout", "Patrol": "Eagle"},
-                {"User ID": "U2", "First Name": "Bob", "Last Name": "Smith", "Patrol": "Falcon"},
-            ],
-        )
-        imported, skipped = import_roster_csv(conn, path)
-        assert imported == 2
-        assert skipped == 0
-        row = conn.execute("SELECT patrol FROM scouts WHERE user_id='U1'").fetchone()
-        assert row["patrol"] == "Eagle"
-
-    def test_alternative_column_names_userid_first_last(self, conn, tmp_path):
-        path = _write_csv(
-            tmp_path,
-            ["UserID", "First", "Last"],
-            [{"UserID": "U3", "First": "Carol", "Last": "Jones"}],
-        )
+    @pytest.mark.parametrize(
+        "headers, rows, expected_imported, probe_sql, probe_expected",
+        [
+            (
+                ["User ID", "First Name", "Last Name", "Patrol"],
+                [
+                    {"User ID": "U1", "First Name": "Alice", "Last Name": "Scout", "Patrol": "Eagle"},
+                    {"User ID": "U2", "First Name": "Bob", "Last Name": "Smith", "Patrol": "Falcon"},
+                ],
+                2,
+                "SELECT patrol FROM scouts WHERE user_id='U1'",
+                "Eagle",
+            ),
+            (
+                ["UserID", "First", "Last"],
+                [{"UserID": "U3", "First": "Carol", "Last": "Jones"}],
+                1,
+                "SELECT first_name FROM scouts WHERE user_id='U3'",
+                "Carol",
+            ),
+            (
+                ["Scouting Member ID", "First Name", "Last Name"],
+                [{"Scouting Member ID": "M100", "First Name": "Eve", "Last Name": "W"}],
+                1,
+                "SELECT user_id FROM scouts WHERE user_id='M100'",
+                "M100",
+            ),
+        ],
+        ids=["scoutbook_columns", "userid_first_last", "member_id_as_primary"],
+    )
+    def test_column_shapes(
+        self, conn, tmp_path, headers, rows, expected_imported, probe_sql, probe_expected
+    ):
+        path = _write_csv(tmp_path, headers, rows)
         imported, skipped = import_roster_csv(conn, path)
-        assert imported == 1
-        assert skipped == 0
-        row = conn.execute("SELECT first_name FROM scouts WHERE user_id='U3'").fetchone()
-        assert row["first_name"] == "Carol"
+        assert (imported, skipped) == (expected_imported, 0)
+        assert conn.execute(probe_sql).fetchone()[0] == probe_expected
 
     def test_name_column_splits_into_first_and_last(self, conn, tmp_path):
         path = _write_csv(
@@ -406,8 +616,7 @@ class TestImportRosterCsv:
         imported, skipped = import_roster_csv(conn, path)
         assert imported == 1
         assert skipped == 1
-        assert conn.execute("SELECT user_id FROM scouts WHERE user_id='U1'").fetchone() is not None
-        assert conn.execute("SELECT user_id FROM scouts WHERE user_id='U2'").fetchone() is None
+        assert [row[0] for row in conn.execute("SELECT user_id FROM scouts")] == ["U1"]
 
     def test_missing_id_columns_raises_value_error(self, conn, tmp_path):
         path = _write_csv(
@@ -431,42 +640,39 @@ class TestImportRosterCsv:
         assert imported == 1
         assert skipped == 1
 
-    def test_member_id_used_as_primary_when_no_user_id(self, conn, tmp_path):
-        path = _write_csv(
-            tmp_path,
-            ["Scouting Member ID", "First Name", "Last Name"],
-            [{"Scouting Member ID": "M100", "First Name": "Eve", "Last Name": "W"}],
-        )
-        imported, _ = import_roster_csv(conn, path)
-        assert imported == 1
-        assert conn.execute("SELECT user_id FROM scouts WHERE user_id='M100'").fetchone() is not None
-
     def test_bom_utf8_encoding_handled(self, conn, tmp_path):
         path = tmp_path / "roster_bom.csv"
-        with open(path, "w", newline="", encoding="utf-8-sig") as f:
-            f.write("User ID,First Name,Last Name\nU9,Test,Scout\n")
+        path.write_bytes("User ID,First Name,Last Name\nU9,Test,Scout\n".encode("utf-8-sig"))
         imported, _ = import_roster_csv(conn, path)
         assert imported == 1
 
+    def test_blank_lines_ignored(self, conn, tmp_path):
+        path = tmp_path / "roster_blank.csv"
+        path.write_text("User ID,First Name,Type\nU1,Alice,YOUTH\n\nU2,Bob,YOUTH\n")
+        assert import_roster_csv(conn, path) == (2, 0)
+
+    def test_short_rows_treat_missing_cells_as_empty(self, conn, tmp_path):
+        path = tmp_path / "roster_short.csv"
+        path.write_text("User ID,First Name,Last Name,Patrol\nU1,Alice\n")
+        imported, skipped = import_roster_csv(conn, path)
+        assert (imported, skipped) == (1, 0)
+        row = conn.execute("SELECT first_name, patrol FROM scouts WHERE user_id='U1'").fetchone()
+        assert row["first_name"] == "Alice"
+        assert row["patrol"] is None
+
 
 # ── store_youth_ranks ─────────────────────────────────────────────────────────
 
 
-class TestStoreYouthRanks:
-    def _make_response(self, program_id=2, ranks=None):
-        return {
-            "program": [
-                {
-                    "programId": program_id,
-                    "program": "Scouts BSA",
-                    "ranks": ranks or [],
-                }
-            ]
-        }
+def _ranks_response(program_id=2, ranks=()):
+    """A youth ranks response with one program."""
+    return {"program": [{"programId": program_id, "program": "Scouts BSA", "ranks": ranks}]}
 
+
+@pytest.mark.usefixtures("default_scout")
+class TestStoreYouthRanks:
     def test_stores_completed_rank(self, conn):
-        _insert_scout(conn, "U1")
-        resp = self._make_response(ranks=[{"id": 1, "name": "Scout", "dateEarned": "2023-01-01"}])
+        resp = _ranks_response(ranks=[{"id": 1, "name": "Scout", "dateEarned": "2023-01-01"}])
         total = store_youth_ranks(conn, "U1", resp)
         assert total == 1
         row = conn.execute(
@@ -476,8 +682,7 @@ class TestStoreYouthRanks:
         assert row["date_completed"] == "2023-01-01"
 
     def test_stores_in_progress_rank(self, conn):
-        _insert_scout(conn, "U1")
-        resp = self._make_response(ranks=[{"id": 5, "name": "Eagle Scout"}])
+        resp = _ranks_response(ranks=[{"id": 5, "name": "Eagle Scout"}])
         store_youth_ranks(conn, "U1", resp)
         row = conn.execute(
             "SELECT status FROM scout_advancements WHERE scout_user_id='U1'"
@@ -485,8 +690,7 @@ class TestStoreYouthRanks:
         assert row["status"] == "in_progress"
 
     def test_updates_current_rank_id_to_highest_earned(self, conn):
-        _insert_scout(conn, "U1")
-        resp = self._make_response(
+        resp = _ranks_response(
             ranks=[
                 {"id": 1, "name": "Scout", "dateEarned": "2022-01-01"},
                 {"id": 3, "name": "First Class", "dateEarned": "2023-06-01"},
@@ -498,15 +702,13 @@ class TestStoreYouthRanks:
         assert row["current_rank_id"] == 3
 
     def test_non_bsa_program_does_not_update_current_rank(self, conn):
-        _insert_scout(conn, "U1")
-        resp = self._make_response(program_id=99, ranks=[{"id": 10, "name": "Lion", "dateEarned": "2020-01-01"}])
+        resp = _ranks_response(program_id=99, ranks=[{"id": 10, "name": "Lion", "dateEarned": "2020-01-01"}])
         store_youth_ranks(conn, "U1", resp)
         row = conn.execute("SELECT current_rank_id FROM scouts WHERE user_id='U1'").fetchone()
         assert row["current_rank_id"] is None
 
     def test_returns_total_count(self, conn):
-        _insert_scout(conn, "U1")
-        resp = self._make_response(
+        resp = _ranks_response(
             ranks=[
                 {"id": 1, "name": "Scout", "dateEarned": "2022-01-01"},
                 {"id": 2, "name": "Tenderfoot"},
@@ -515,8 +717,12 @@ class TestStoreYouthRanks:
         total = store_youth_ranks(conn, "U1", resp)
         assert total == 2
 
+    def test_leaves_transaction_open_for_caller(self, conn):
+        resp = _ranks_response(ranks=[{"id": 1, "name": "Scout"}])
+        store_youth_ranks(conn, "U1", resp)
+        assert conn.in_transaction
+
     def test_empty_programs_returns_zero(self, conn):
-        _insert_scout(conn, "U1")
         total = store_youth_ranks(conn, "U1", {"program": []})
         assert total == 0
 
@@ -524,9 +730,9 @@ class TestStoreYouthRanks:
 # ── store_youth_merit_badges ──────────────────────────────────────────────────
 
 
+@pytest.mark.usefixtures("default_scout")
 class TestStoreYouthMeritBadges:
     def test_completed_mb(self, conn):
-        _insert_scout(conn, "U1")
         items = [{"name": "Cooking", "dateCompleted": "2023-05-01", "isEagleRequired": True, "id": 50, "versionId": "v1"}]
         earned, total = store_youth_merit_badges(conn, "U1", items)
         assert earned == 1
@@ -538,7 +744,6 @@ class TestStoreYouthMeritBadges:
         assert row["date_completed"] == "2023-05-01"
 
     def test_in_progress_mb_with_date_started(self, conn):
-        _insert_scout(conn, "U1")
         items = [{"name": "Camping", "dateStarted": "2023-01-01", "id": 51, "versionId": "v1"}]
         earned, total = store_youth_merit_badges(conn, "U1", items)
         assert earned == 0
@@ -548,8 +753,14 @@ class TestStoreYouthMeritBadges:
         ).fetchone()
         assert row["status"] == "in_progress"
 
+    def test_restore_updates_row_in_place(self, conn):
+        store_youth_merit_badges(conn, "U1", [{"name": "Camping", "dateStarted": "2023-01-01"}])
+        row_id = conn.execute("SELECT id FROM scout_merit_badges").fetchone()["id"]
+        store_youth_merit_badges(conn, "U1", [{"name": "Camping", "dateCompleted": "2023-06-01"}])
+        rows = conn.execute("SELECT id, status FROM scout_merit_badges").fetchall()
+        assert [(r["id"], r["status"]) for r in rows] == [(row_id, "completed")]
+
     def test_updates_merit_badge_eagle_flag(self, conn):
-        _insert_scout(conn, "U1")
         items = [{"name": "NewBadge", "dateCompleted": "2023-01-01", "isEagleRequired": True, "id": 99, "versionId": "v1"}]
         store_youth_merit_badges(conn, "U1", items)
         row = conn.execute(
@@ -558,7 +769,6 @@ class TestStoreYouthMeritBadges:
         assert row["is_eagle_required"] == 1
 
     def test_uses_short_field_when_name_absent(self, conn):
-        _insert_scout(conn, "U1")
         items = [{"short": "FallbackName", "dateCompleted": "2023-01-01", "id": 77, "versionId": "v1"}]
         store_youth_merit_badges(conn, "U1", items)
         row = conn.execute(
@@ -567,25 +777,21 @@ class TestStoreYouthMeritBadges:
         assert row["merit_badge_name"] == "FallbackName"
 
     def test_empty_list_returns_zeros(self, conn):
-        _insert_scout(conn, "U1")
         earned, total = store_youth_merit_badges(conn, "U1", [])
         assert earned == 0
         assert total == 0
 
     def test_non_list_input_treated_as_empty(self, conn):
-        _insert_scout(conn, "U1")
         earned, total = store_youth_merit_badges(conn, "U1", {"unexpected": "dict"})
         assert earned == 0
         assert total == 0
 
     def test_date_earned_field_recognized(self, conn):
-        _insert_scout(conn, "U1")
         items = [{"name": "Swimming", "dateEarned": "2023-03-01", "id": 60, "versionId": "v1"}]
         earned, total = store_youth_merit_badges(conn, "U1", items)
         assert earned == 1
 
     def test_multiple_mbs_for_same_scout(self, conn):
-        _insert_scout(conn, "U1")
         items = [
             {"name": "Cooking", "dateCompleted": "2023-01-01", "id": 1, "versionId": "v1"},
             {"name": "Swimming", "dateCompleted": "2023-02-01", "id": 2, "versionId": "v1"},
@@ -594,6 +800,15 @@ class TestStoreYouthMeritBadges:
         earned, total = store_youth_merit_badges(conn, "U1", items)
         assert earned == 2
         assert total == 3
+        rows = conn.execute(
+            "SELECT merit_badge_name, status, date_completed, mb_api_id"
+            " FROM scout_merit_badges WHERE scout_user_id='U1' ORDER BY mb_api_id"
+        ).fetchall()
+        assert [tuple(r) for r in rows] == [
+            ("Cooking", "completed", "2023-01-01", 1),
+            ("Swimming", "completed", "2023-02-01", 2),
+            ("Camping", "in_progress", None, 3),
+        ]
 
 
 # ── upsert_mb_requirements ────────────────────────────────────────────────────
@@ -651,9 +866,9 @@ class TestUpsertMbRequirements:
 # ── store_youth_mb_requirements ───────────────────────────────────────────────
 
 
+@pytest.mark.usefixtures("default_scout")
 class TestStoreYouthMbRequirements:
     def test_completed_requirement(self, conn):
-        _insert_scout(conn, "U1")
         count = store_youth_mb_requirements(conn, "U1", 50, "v1", [{"id": 1000, "dateCompleted": "2023-06-01"}])
         assert count == 1
         row = conn.execute(
@@ -663,7 +878,6 @@ class TestStoreYouthMbRequirements:
         assert row["date_completed"] == "2023-06-01"
 
     def test_incomplete_requirement(self, conn):
-        _insert_scout(conn, "U1")
         store_youth_mb_requirements(conn, "U1", 50, "v1", [{"id": 1001}])
         row = conn.execute(
             "SELECT completed FROM scout_mb_requirement_completions WHERE scout_user_id='U1'"
@@ -671,7 +885,6 @@ class TestStoreYouthMbRequirements:
         assert row["completed"] == 0
 
     def test_date_earned_field_recognized(self, conn):
-        _insert_scout(conn, "U1")
         store_youth_mb_requirements(conn, "U1", 50, "v1", [{"id": 1002, "dateEarned": "2023-01-01"}])
         row = conn.execute(
             "SELECT completed FROM scout_mb_requirement_completions WHERE scout_user_id='U1'"
@@ -679,7 +892,6 @@ class TestStoreYouthMbRequirements:
         assert row["completed"] == 1
 
     def test_recursive_children(self, conn):
-        _insert_scout(conn, "U1")
         reqs = [
             {
                 "id": 2000,
@@ -689,14 +901,18 @@ class TestStoreYouthMbRequirements:
         ]
         count = store_youth_mb_requirements(conn, "U1", 55, "v2", reqs)
         assert count == 2
+        rows = conn.execute(
+            "SELECT mb_requirement_id, completed, date_completed"
+            " FROM scout_mb_requirement_completions WHERE scout_user_id='U1'"
+            " ORDER BY mb_requirement_id"
+        ).fetchall()
+        assert [tuple(r) for r in rows] == [(2000, 1, "2023-01-01"), (2001, 0, None)]
 
     def test_from_dict_value_key(self, conn):
-        _insert_scout(conn, "U1")
         count = store_youth_mb_requirements(conn, "U1", 60, "v1", {"value": [{"id": 3000}]})
         assert count == 1
 
     def test_stores_mb_api_id(self, conn):
-        _insert_scout(conn, "U1")
         store_youth_mb_requirements(conn, "U1", 77, "v2", [{"id": 4000}])
         row = conn.execute(
             "SELECT mb_api_id, mb_version_id FROM scout_mb_requirement_completions WHERE scout_user_id='U1'"
@@ -708,10 +924,10 @@ class TestStoreYouthMbRequirements:
 # ── store_youth_rank_requirements ─────────────────────────────────────────────
 
 
+@pytest.mark.usefixtures("default_scout")
 class TestStoreYouthRankRequirements:
     def _setup(self, conn, req_id=500, rank_id=10):
         _insert_rank(conn, rank_id)
-        _insert_scout(conn, "U1")
         conn.execute(
             "INSERT INTO requirements (id, rank_id, required) VALUES (?, ?, 1)",
             (req_id, rank_id),
@@ -728,6 +944,16 @@ class TestStoreYouthRankRequirements:
         assert row["completed"] == 1
         assert row["date_completed"] == "2023-03-01"
 
+    def test_unchanged_row_is_not_rewritten(self, conn):
+        self._setup(conn)
+        reqs = [{"id": 500, "dateCompleted": "2023-03-01"}]
+        store_youth_rank_requirements(conn, "U1", 10, reqs)
+        before = conn.total_changes
+        store_youth_rank_requirements(conn, "U1", 10, reqs)
+        assert conn.total_changes == before
+        store_youth_rank_requirements(conn, "U1", 10, [{"id": 500}])
+        assert conn.total_changes == before + 1
+
     def test_incomplete_requirement(self, conn):
         self._setup(conn)
         store_youth_rank_requirements(conn, "U1", 10, [{"id": 500}])
@@ -738,7 +964,6 @@ class TestStoreYouthRankRequirements:
 
     def test_recursive_children(self, conn):
         _insert_rank(conn, 10)
-        _insert_scout(conn, "U1")
         conn.execute("INSERT INTO requirements (id, rank_id, required) VALUES (600, 10, 1)")
         conn.execute(
             "INSERT INTO requirements (id, rank_id, parent_requirement_id, required) VALUES (601, 10, 600, 1)"
@@ -747,6 +972,12 @@ class TestStoreYouthRankRequirements:
         reqs = [{"id": 600, "requirements": [{"id": 601, "dateCompleted": "2023-01-01"}]}]
         count = store_youth_rank_requirements(conn, "U1", 10, reqs)
         assert count == 2
+        rows = conn.execute(
+            "SELECT requirement_id, completed, date_completed"
+            " FROM scout_requirement_completions WHERE scout_user_id='U1'"
+            " ORDER BY requirement_id"
+        ).fetchall()
+        assert [tuple(r) for r in rows] == [(600, 0, None), (601, 1, "2023-01-01")]
 
     def test_from_dict_value_key(self, conn):
         self._setup(conn)
@@ -762,9 +993,17 @@ class TestStoreYouthRankRequirements:
 # ── store_leadership ──────────────────────────────────────────────────────────
 
 
+def _leadership_row(conn, user_id="U1"):
+    return conn.execute(
+        "SELECT position, start_date, approved, days_in_position"
+        " FROM scout_leadership WHERE scout_user_id=?",
+        (user_id,),
+    ).fetchone()
+
+
+@pytest.mark.usefixtures("default_scout")
 class TestStoreLeadership:
     def test_from_list(self, conn):
-        _insert_scout(conn, "U1")
         positions = [
             {
                 "positionTitle": "Senior Patrol Leader",
@@ -776,47 +1015,39 @@ class TestStoreLeadership:
         ]
         count = store_leadership(conn, "U1", positions)
         assert count == 1
-        row = conn.execute(
-            "SELECT position, approved, days_in_position FROM scout_leadership WHERE scout_user_id='U1'"
-        ).fetchone()
+        row = _leadership_row(conn)
         assert row["position"] == "Senior Patrol Leader"
         assert row["approved"] == 1
         assert row["days_in_position"] == 365
 
     def test_from_dict_value_key(self, conn):
-        _insert_scout(conn, "U1")
         data = {"value": [{"positionTitle": "Patrol Leader", "dateStarted": "2023-06-01"}]}
         count = store_leadership(conn, "U1", data)
         assert count == 1
 
     def test_from_dict_positions_key(self, conn):
-        _insert_scout(conn, "U1")
         data = {"positions": [{"position": "Scribe", "dateStarted": "2023-01-01"}]}
         count = store_leadership(conn, "U1", data)
         assert count == 1
-        row = conn.execute("SELECT position FROM scout_leadership WHERE scout_user_id='U1'").fetchone()
+        row = _leadership_row(conn)
         assert row["position"] == "Scribe"
 
     def test_uses_title_field_as_fallback(self, conn):
-        _insert_scout(conn, "U1")
         store_leadership(conn, "U1", [{"title": "Librarian"}])
-        row = conn.execute("SELECT position FROM scout_leadership WHERE scout_user_id='U1'").fetchone()
+        row = _leadership_row(conn)
         assert row["position"] == "Librarian"
 
     def test_defaults_to_unknown_when_no_position_field(self, conn):
-        _insert_scout(conn, "U1")
         store_leadership(conn, "U1", [{}])
-        row = conn.execute("SELECT position FROM scout_leadership WHERE scout_user_id='U1'").fetchone()
+        row = _leadership_row(conn)
         assert row["position"] == "Unknown"
 
     def test_unapproved_stored_as_zero(self, conn):
-        _insert_scout(conn, "U1")
         store_leadership(conn, "U1", [{"positionTitle": "SPL"}])
-        row = conn.execute("SELECT approved FROM scout_leadership WHERE scout_user_id='U1'").fetchone()
+        row = _leadership_row(conn)
         assert row["approved"] == 0
 
     def test_multiple_positions_returns_count(self, conn):
-        _insert_scout(conn, "U1")
         positions = [
             {"positionTitle": "SPL"},
             {"positionTitle": "ASPL"},
@@ -826,7 +1057,29 @@ class TestStoreLeadership:
         assert count == 3
 
     def test_start_date_field_recognized(self, conn):
-        _insert_scout(conn, "U1")
         store_leadership(conn, "U1", [{"positionTitle": "SPL", "startDate": "2023-01-01"}])
-        row = conn.execute("SELECT start_date FROM scout_leadership WHERE scout_user_id='U1'").fetchone()
+        row = _leadership_row(conn)
         assert row["start_date"] == "2023-01-01"
+
+
+# ── stored_definitions ────────────────────────────────────────────────────────
+
+
+class TestStoredDefinitions:
+    def test_empty_database(self, conn):
+        assert stored_definitions(conn) == (set(), {})
+
+    def test_reports_ranks_and_mb_versions(self, conn):
+        _insert_rank(conn, 10)
+        upsert_requirements(conn, 10, [{"id": 100}])
+        upsert_mb_requirements(conn, 55, "7", [{"id": 550}])
+        upsert_mb_requirements(conn, 55, "8", [{"id": 551}])
+        rank_ids, mb_versions = stored_definitions(conn)
+        assert rank_ids == {10}
+        assert mb_versions == {55: {"7", "8"}}
+
+    def test_latest_mb_version_compares_numerically(self, conn):
+        upsert_mb_requirements(conn, 55, "9", [{"id": 550}])
+        upsert_mb_requirements(conn, 55, "10", [{"id": 551}])
+        _, mb_versions = stored_definitions(conn)
+        assert latest_mb_version(mb_versions[55]) == "10"
@@ -1,10 +1,7 @@
 """Tests for scouting_db.queries."""
 
-import sqlite3
-
 import pytest
 
-from scouting_db.db import init_db
 from scouting_db.queries import (
     mb_requirement_detail,
     most_common_incomplete_merit_badges,
@@ -15,84 +12,76 @@ from scouting_db.queries import (
 )
 
 
-# ── Fixtures & helpers ────────────────────────────────────────────────────────
+# ── Helpers ───────────────────────────────────────────────────────────────────
 
 
-@pytest.fixture
-def conn():
-    """Fresh in-memory DB with schema and Eagle MBs seeded."""
-    c = sqlite3.connect(":memory:")
-    c.execute("PRAGMA foreign_keys=ON")
-    c.row_factory = sqlite3.Row
-    init_db(c)
-    return c
+# Tests use the shared conn and default_scout fixtures from conftest.py. The
+# _add_* helpers don't commit: each test seeds and queries on the same
+# connection, which sees its own uncommitted rows.
 
 
 def _add_rank(conn, rank_id, name="Test Rank", level=0, program_id=2):
     conn.execute(
-        "INSERT OR REPLACE INTO ranks (id, name, level, program_id, active) VALUES (?, ?, ?, ?, 1)",
+        "INSERT INTO ranks (id, name, level, program_id, active) VALUES (?, ?, ?, ?, 1)",
         (rank_id, name, level, program_id),
     )
-    conn.commit()
 
 
 def _add_scout(conn, user_id, first, last, rank_id=None):
     conn.execute(
-        "INSERT OR REPLACE INTO scouts (user_id, first_name, last_name, current_rank_id) VALUES (?, ?, ?, ?)",
+        "INSERT INTO scouts (user_id, first_name, last_name, current_rank_id) VALUES (?, ?, ?, ?)",
         (user_id, first, last, rank_id),
     )
-    conn.commit()
 
 
-def _add_mb(conn, name, is_eagle=0):
-    conn.execute(
+def _add_mbs(conn, names, is_eagle=0):
+    conn.executemany(
         "INSERT OR IGNORE INTO merit_badges (name, is_eagle_required, active) VALUES (?, ?, 1)",
-        (name, is_eagle),
+        [(name, is_eagle) for name in names],
     )
-    conn.commit()
+
+
+def _add_mb(conn, name, is_eagle=0):
+    _add_mbs(conn, [name], is_eagle)
 
 
 def _add_scout_mb(conn, user_id, name, status="completed", mb_api_id=None):
     conn.execute(
-        "INSERT OR REPLACE INTO scout_merit_badges "
+        "INSERT INTO scout_merit_badges "
         "(scout_user_id, merit_badge_name, status, mb_api_id) VALUES (?, ?, ?, ?)",
         (user_id, name, status, mb_api_id),
     )
-    conn.commit()
 
 
 def _add_requirement(conn, req_id, rank_id, req_number="1", parent_id=None, required=1):
     conn.execute(
-        "INSERT OR REPLACE INTO requirements "
+        "INSERT INTO requirements "
         "(id, rank_id, requirement_number, required, parent_requirement_id) "
         "VALUES (?, ?, ?, ?, ?)",
         (req_id, rank_id, req_number, required, parent_id),
     )
-    conn.commit()
 
 
 def _add_req_completion(conn, user_id, req_id, rank_id, completed=1):
     conn.execute(
-        "INSERT OR REPLACE INTO scout_requirement_completions "
+        "INSERT INTO scout_requirement_completions "
         "(scout_user_id, requirement_id, rank_id, completed) VALUES (?, ?, ?, ?)",
         (user_id, req_id, rank_id, completed),
     )
-    conn.commit()
 
 
 # ── most_common_incomplete_merit_badges ───────────────────────────────────────
 
 
+@pytest.mark.usefixtures("default_scout")
 class TestMostCommonIncompleteMeritBadges:
     def test_includes_mbs_not_completed_by_scouts(self, conn):
-        _add_scout(conn, "U1", "Alice", "S")
         _add_mb(conn, "Rowing")
         rows = most_common_incomplete_merit_badges(conn)
         names = [r["merit_badge"] for r in rows]
         assert "Rowing" in names
 
     def test_excludes_mbs_completed_by_all_scouts(self, conn):
-        _add_scout(conn, "U1", "Alice", "S")
         # "Swimming" is already Eagle-seeded; complete it for U1
         _add_scout_mb(conn, "U1", "Swimming", status="completed")
         rows = most_common_incomplete_merit_badges(conn)
@@ -100,26 +89,32 @@ class TestMostCommonIncompleteMeritBadges:
         assert "Swimming" not in names
 
     def test_eagle_only_filter_excludes_non_eagle(self, conn):
-        _add_scout(conn, "U1", "Alice", "S")
         _add_mb(conn, "Rowing", is_eagle=0)
         rows = most_common_incomplete_merit_badges(conn, eagle_only=True)
         names = [r["merit_badge"] for r in rows]
         assert "Rowing" not in names
 
     def test_eagle_only_filter_includes_eagle_mbs(self, conn):
-        _add_scout(conn, "U1", "Alice", "S")
         rows = most_common_incomplete_merit_badges(conn, eagle_only=True)
         # All 18 Eagle MBs should appear (scout hasn't completed any)
         assert len(rows) > 0
         assert all(r["is_eagle_required"] == 1 for r in rows)
 
     def test_limit_parameter_respected(self, conn):
-        _add_scout(conn, "U1", "Alice", "S")
-        for i in range(10):
-            _add_mb(conn, f"ExtraBadge{i}")
+        _add_mbs(conn, [f"ExtraBadge{i}" for i in range(10)])
         rows = most_common_incomplete_merit_badges(conn, limit=3)
         assert len(rows) <= 3
 
+    def test_returns_expected_columns(self, conn):
+        _add_mb(conn, "TestBadge")
+        rows = most_common_incomplete_merit_badges(conn)
+        assert len(rows) > 0
+        keys = rows[0].keys()
+        for col in ("merit_badge", "is_eagle_required", "scouts_needing", "total_scouts", "pct_needing"):
+            assert col in keys
+
+
+class TestMostCommonIncompleteMeritBadgesTroop:
     def test_scouts_needing_reflects_count(self, conn):
         _add_scout(conn, "U1", "Alice", "S")
         _add_scout(conn, "U2", "Bob", "S")
@@ -141,15 +136,6 @@ class TestMostCommonIncompleteMeritBadges:
         assert row is not None
         assert row["scouts_needing"] == 1
 
-    def test_returns_expected_columns(self, conn):
-        _add_scout(conn, "U1", "Alice", "S")
-        _add_mb(conn, "TestBadge")
-        rows = most_common_incomplete_merit_badges(conn)
-        assert len(rows) > 0
-        keys = rows[0].keys()
-        for col in ("merit_badge", "is_eagle_required", "scouts_needing", "total_scouts", "pct_needing"):
-            assert col in keys
-
     def test_empty_scouts_returns_empty(self, conn):
         rows = most_common_incomplete_merit_badges(conn)
         assert rows == []
@@ -293,6 +279,12 @@ class TestRequirementCompletionMatrix:
         for col in ("requirement_number", "scouts_completed", "scouts_needing", "pct_incomplete"):
             assert col in keys
 
+    def test_includes_rank_name(self, conn):
+        _add_rank(conn, 10, "Tenderfoot")
+        _add_requirement(conn, 500, 10, "1")
+        rows = requirement_completion_matrix(conn, 10)
+        assert rows[0]["rank_name"] == "Tenderfoot"
+
 
 # ── per_scout_summary ─────────────────────────────────────────────────────────
 
@@ -360,34 +352,26 @@ class TestMbRequirementDetail:
     def _setup_in_progress_mb(self, conn):
         """Set up U1 with 'First Aid' in_progress, two requirements (one done, one not)."""
         _add_scout(conn, "U1", "Alice", "S")
-        conn.execute(
+        conn.executemany(
             "INSERT INTO mb_requirements "
             "(id, mb_api_id, mb_version_id, requirement_number, name, required, parent_requirement_id) "
             "VALUES (?, ?, ?, ?, ?, 1, NULL)",
-            (1001, 50, "v1", "1", "Demonstrate first aid"),
-        )
-        conn.execute(
-            "INSERT INTO mb_requirements "
-            "(id, mb_api_id, mb_version_id, requirement_number, name, required, parent_requirement_id) "
-            "VALUES (?, ?, ?, ?, ?, 1, NULL)",
-            (1002, 50, "v1", "2", "Show bandaging"),
+            [
+                (1001, 50, "v1", "1", "Demonstrate first aid"),
+                (1002, 50, "v1", "2", "Show bandaging"),
+            ],
         )
         conn.execute(
             "INSERT INTO scout_merit_badges "
             "(scout_user_id, merit_badge_name, status, mb_api_id, mb_version_id) "
             "VALUES ('U1', 'First Aid', 'in_progress', 50, 'v1')"
         )
-        conn.execute(
-            "INSERT INTO scout_mb_requirement_completions "
-            "(scout_user_id, mb_requirement_id, mb_api_id, mb_version_id, completed) "
-            "VALUES ('U1', 1001, 50, 'v1', 1)"
-        )
-        conn.execute(
+        conn.executemany(
             "INSERT INTO scout_mb_requirement_completions "
             "(scout_user_id, mb_requirement_id, mb_api_id, mb_version_id, completed) "
-            "VALUES ('U1', 1002, 50, 'v1', 0)"
+            "VALUES ('U1', ?, 50, 'v1', ?)",
+            [(1001, 1), (1002, 0)],
         )
-        conn.commit()
 
     def test_returns_requirement_rows(self, conn):
         self._setup_in_progress_mb(conn)
@@ -436,7 +420,6 @@ class TestMbRequirementDetail:
             "(scout_user_id, mb_requirement_id, mb_api_id, mb_version_id, completed) "
             "VALUES ('U1', 2001, 60, 'v1', 1)"
         )
-        conn.commit()
         rows = mb_requirement_detail(conn)
         assert rows == []
 
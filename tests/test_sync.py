@@ -0,0 +1,234 @@
+"""Tests for scouting_db.sync."""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from scouting_db.api import ScoutingAPI, ScoutingAPIError
+from scouting_db.sync import (
+    DefinitionCache,
+    fetch_scout,
+    fetch_scouts,
+    in_progress_merit_badges,
+    in_progress_rank_ids,
+)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+
+RANKS = {
+    "program": [
+        {
+            "programId": 2,
+            "ranks": [
+                {"id": 1, "name": "Scout", "dateEarned": "2023-01-01"},
+                {"id": 2, "name": "Tenderfoot"},
+            ],
+        },
+        {"programId": 1, "ranks": [{"id": 9, "name": "Lion"}]},
+    ]
+}
+MBS = [
+    {"id": 55, "name": "Camping"},
+    {"id": 56, "name": "Cooking", "dateCompleted": "2023-02-01"},
+]
+
+
+def _fake_api(responses):
+    """A ScoutingAPI whose _request serves *responses* keyed by path.
+
+    A ScoutingAPIError value is raised instead of returned.
+    """
+    api = ScoutingAPI(token="tok")
+    calls = []
+    lock = threading.Lock()
+
+    def _request(path, params=None, **kwargs):
+        with lock:
+            calls.append(path)
+        result = responses.get(path, {})
+        if isinstance(result, ScoutingAPIError):
+            raise result
+        return result
+
+    patcher = patch.object(api, "_request", side_effect=_request)
+    patcher.start()
+    api.calls = calls
+    api.stop = patcher.stop
+    return api
+
+
+def _youth(uid, ranks=RANKS, mbs=MBS):
+    return {
+        f"/advancements/v2/youth/{uid}/ranks": ranks,
+        f"/advancements/v2/youth/{uid}/meritBadges": mbs,
+        f"/advancements/v2/youth/{uid}/ranks/2/requirements": {"requirements": [{"id": 20}]},
+        f"/advancements/v2/youth/{uid}/meritBadges/55/requirements": {"requirements": [{"id": 550}]},
+    }
+
+
+# ── in-progress selection ─────────────────────────────────────────────────────
+
+
+class TestInProgress:
+    def test_rank_ids_only_unearned_scouts_bsa(self):
+        assert in_progress_rank_ids(RANKS) == [2]
+
+    def test_rank_ids_empty_for_none(self):
+        assert in_progress_rank_ids(None) == []
+
+    def test_merit_badges_only_incomplete_with_id(self):
+        mbs = MBS + [{"name": "No Id"}]
+        assert [mb["id"] for mb in in_progress_merit_badges(mbs)] == [55]
+
+    def test_rank_ids_deduplicated(self):
+        ranks = {"program": [{"programId": 2, "ranks": [{"id": 2}, {"id": "2"}]}]}
+        assert in_progress_rank_ids(ranks) == [2]
+
+    def test_merit_badges_deduplicated(self):
+        mbs = [{"id": 55, "name": "Camping"}, {"id": 55, "name": "Camping"}]
+        assert in_progress_merit_badges(mbs) == [mbs[0]]
+
+    def test_merit_badges_non_list_is_empty(self):
+        assert in_progress_merit_badges({"value": []}) == []
+
+
+# ── DefinitionCache ───────────────────────────────────────────────────────────
+
+
+class TestDefinitionCache:
+    def test_fetches_each_definition_once(self):
+        api = _fake_api({"/advancements/ranks/2/requirements": {"requirements": []}})
+        defs = DefinitionCache(api)
+        defs.rank(2)
+        defs.rank(2)
+        api.stop()
+        assert api.calls == ["/advancements/ranks/2/requirements"]
+
+    def test_stored_definitions_not_fetched(self):
+        api = _fake_api({})
+        defs = DefinitionCache(api, stored=({2}, {55: {"7"}}))
+        assert defs.rank(2) is None
+        assert defs.merit_badge(55, "7") is None
+        assert defs.merit_badge(55) is None
+        api.stop()
+        assert api.calls == []
+
+    def test_new_mb_version_is_fetched(self):
+        api = _fake_api({"/advancements/meritBadges/55/requirements": {"requirements": []}})
+        defs = DefinitionCache(api, stored=(set(), {55: {"7"}}))
+        assert defs.merit_badge(55, 8) == {"requirements": []}
+        api.stop()
+        assert api.calls == ["/advancements/meritBadges/55/requirements"]
+
+    def test_failed_fetch_is_retried(self):
+        path = "/advancements/meritBadges/55/requirements"
+        api = _fake_api({path: ScoutingAPIError(500, "boom")})
+        defs = DefinitionCache(api)
+        with pytest.raises(ScoutingAPIError):
+            defs.merit_badge(55)
+        with pytest.raises(ScoutingAPIError):
+            defs.merit_badge(55)
+        api.stop()
+        assert api.calls == [path, path]
+
+
+# ── fetch_scout / fetch_scouts ────────────────────────────────────────────────
+
+
+class TestFetchScout:
+    def test_fetches_requirements_for_in_progress_items(self):
+        api = _fake_api(_youth("U1"))
+        fetched = fetch_scout(api, "U1", DefinitionCache(api))
+        api.stop()
+        assert fetched.parts["ranks"].result() == RANKS
+        assert [rank_id for rank_id, _ in fetched.rank_reqs] == [2]
+        _, youth = fetched.rank_reqs[0][1].result()
+        assert youth == {"requirements": [{"id": 20}]}
+        assert [mb["id"] for mb, _ in fetched.mb_reqs] == [55]
+
+    def test_skip_reqs_fetches_no_requirements(self):
+        api = _fake_api(_youth("U1"))
+        fetched = fetch_scout(api, "U1", DefinitionCache(api), skip_reqs=True)
+        for fut in fetched.parts.values():
+            fut.result()
+        api.stop()
+        assert fetched.rank_reqs == [] and fetched.mb_reqs == []
+        assert not any("requirements" in c for c in api.calls)
+
+    def test_errors_surface_from_result(self):
+        responses = _youth("U1")
+        responses["/advancements/v2/youth/U1/ranks/2/requirements"] = ScoutingAPIError(403, "no")
+        api = _fake_api(responses)
+        fetched = fetch_scout(api, "U1", DefinitionCache(api))
+        api.stop()
+        with pytest.raises(ScoutingAPIError) as exc_info:
+            fetched.rank_reqs[0][1].result()
+        assert exc_info.value.status_code == 403
+
+    def test_failed_ranks_fetch_skips_rank_requirements(self):
+        responses = _youth("U1")
+        responses["/advancements/v2/youth/U1/ranks"] = ScoutingAPIError(500, "boom")
+        api = _fake_api(responses)
+        fetched = fetch_scout(api, "U1", DefinitionCache(api))
+        api.stop()
+        assert fetched.rank_reqs == []
+        assert [mb["id"] for mb, _ in fetched.mb_reqs] == [55]
+
+
+class TestFetchScouts:
+    def test_yields_in_roster_order(self):
+        uids = [f"U{i}" for i in range(10)]
+        responses = {}
+        for uid in uids:
+            responses.update(_youth(uid))
+        api = _fake_api(responses)
+        fetched = list(fetch_scouts(api, uids, jobs=4))
+        api.stop()
+        assert [f.user_id for f in fetched] == uids
+
+    def test_shared_definitions_fetched_once(self):
+        uids = ["U1", "U2", "U3"]
+        responses = {}
+        for uid in uids:
+            responses.update(_youth(uid))
+        api = _fake_api(responses)
+        list(fetch_scouts(api, uids, jobs=3))
+        api.stop()
+        assert api.calls.count("/advancements/ranks/2/requirements") == 1
+        assert api.calls.count("/advancements/meritBadges/55/requirements") == 1
+
+    def test_skip_profile_only_for_listed_scouts(self):
+        uids = ["U1", "U2"]
+        responses = {}
+        for uid in uids:
+            responses.update(_youth(uid))
+        api = _fake_api(responses)
+        fetched = list(fetch_scouts(api, uids, jobs=2, skip_profile={"U1"}))
+        for f in fetched:
+            for fut in f.parts.values():
+                fut.result()
+        api.stop()
+        assert "profile" not in fetched[0].parts
+        assert "profile" in fetched[1].parts
+        assert "/persons/v2/U1/personprofile" not in api.calls
+        assert "/persons/v2/U2/personprofile" in api.calls
+
+    def test_before_wait_runs_before_blocking(self):
+        released = threading.Event()
+        api = _fake_api(_youth("U1"))
+        request = api._request.side_effect
+
+        def _request(path, params=None, **kwargs):
+            if path.startswith("/advancements/v2/youth/U2/"):
+                released.wait(5)
+            return request(path, params, **kwargs)
+
+        api._request.side_effect = _request
+        fetched = list(fetch_scouts(api, ["U1", "U2"], skip_reqs=True, jobs=2,
+                                    before_wait=released.set))
+        api.stop()
+        assert released.is_set()
+        assert all(f.done() for s in fetched for f in s.parts.values())